@@ -0,0 +1,121 @@
+"""Compact integer encoding of cards.
+
+A card is stored as its number, 0 to 51, in card_trick.CARD_NAMES and a deck
+is a bytearray of those numbers. A deck is then 52 bytes instead of 52
+strings, which makes it cheap to hash, copy and send between processes.
+Cards are only turned back into names when they are printed.
+
+The engine functions in trick_engine work on encoded decks unchanged, as the
+deal and pick up only move cards around.
+"""
+
+# pylint: disable=C0103
+
+from random import shuffle
+
+from card_trick import CARD_NAMES, print_card_pile
+from trick_engine import NUMBER_OF_CARDS, compile_plan
+
+
+CARD_CODES = {name: code for code, name in enumerate(CARD_NAMES)}
+
+
+def make_encoded_deck(rng=None):
+    """Creates and shuffles a deck of encoded cards.
+
+    Parameters
+    ----------
+    rng: Optional random.Random to shuffle with, see card_trick.make_deck.
+
+    Returns
+    -------
+    new_deck: A bytearray containing a randomly shuffled deck of the card
+              numbers 0 to 51.
+    """
+    new_deck = bytearray(range(len(CARD_NAMES)))
+
+    if rng is None:
+        shuffle(new_deck)
+    else:
+        rng.shuffle(new_deck)
+
+    return new_deck
+
+
+def encode_cards(card_pile):
+    """Turns a list of card names into their card numbers.
+
+    Parameters
+    ----------
+    card_pile: A list of card names, e.g. from make_deck.
+
+    Returns
+    -------
+    encoded_pile: A bytes object with the number of each card.
+    """
+    return bytes(CARD_CODES[card] for card in card_pile)
+
+
+def decode_cards(encoded_pile):
+    """Turns card numbers back into card names.
+
+    Parameters
+    ----------
+    encoded_pile: A sequence of card numbers.
+
+    Returns
+    -------
+    card_pile: A list of the card names.
+    """
+    return [CARD_NAMES[code] for code in encoded_pile]
+
+
+def card_name(code):
+    """Returns the name of a single card number, e.g. for the final reveal."""
+    return CARD_NAMES[code]
+
+
+def print_encoded_card_pile(pile_number, encoded_pile):
+    """Prints a pile of card numbers with print_card_pile.
+
+    Parameters
+    ----------
+    pile_number: An int literal containing the pile number to print.
+    encoded_pile: A sequence of the card numbers to format and print.
+    """
+    print_card_pile(pile_number, decode_cards(encoded_pile))
+
+
+def print_encoded_three_card_piles(card_piles):
+    """Prints 3 piles of card numbers followed by a blank line.
+
+    Parameters
+    ----------
+    card_piles: A 2 dimensional list containing 3 piles of card numbers.
+    """
+    for pile_number, encoded_pile in enumerate(card_piles, 1):
+        print_encoded_card_pile(pile_number, encoded_pile)
+    print()
+
+
+def run_encoded_session(pile_choices, deck=None):
+    """Runs one scripted session on an encoded deck.
+
+    Parameters
+    ----------
+    pile_choices: A sequence of 3 pile numbers (1 to 3), one for each round.
+    deck: Optional encoded deck of at least 21 cards. A new one is made when
+          this is not given.
+
+    Returns
+    -------
+    deck_fragment: A bytes object of the 21 card numbers after the last pick
+                   up. The chosen card is at index 10.
+    """
+    if deck is None:
+        deck = make_encoded_deck()
+
+    if len(deck) < NUMBER_OF_CARDS:
+        raise ValueError("Expected a deck of at least 21 cards.")
+
+    return bytes(deck[position] for position in compile_plan(pile_choices))
@@ -11,25 +11,42 @@
 
 # pylint: disable=C0103, C0325, W0621
 
-from random import shuffle
+import sys
 
+# Nothing runs on import and random is only imported when a deck is made, so
+# worker processes can import these functions cheaply. The game is started
+# with main(), e.g. by running this file.
 
-def make_deck():
+
+SUITS = ("Spades", "Diamonds", "Hearts", "Clubs")
+VALUES = ("Ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "Jack",
+          "Queen", "King")
+
+# Names of all 52 cards, built once. A card's index in this tuple is its
+# number in the compact encoding used by card_encoding.
+CARD_NAMES = tuple(value + " of " + suit for suit in SUITS for value in VALUES)
+
+
+def make_deck(rng=None):
     """Create and shuffles a deck of cards.
 
+    Parameters
+    ----------
+    rng: Optional random.Random to shuffle with, e.g. a session's own stream
+         from trick_random. The random module's global generator is used
+         when this is not given.
+
     Returns
     -------
     new_deck: A list containing a randomly shuffled deck of 52 cards.
     """
-    new_deck = []
-
-    # Creates full deck of cards with nested for loop.
-    for suit in "Spades", "Diamonds", "Hearts", "Clubs":
-        for value in ["Ace", "2", "3", "4", "5", "6", "7", "8", "9", "10",
-                      "Jack", "Queen", "King"]:
-            new_deck.append(value + " of " + suit)
+    new_deck = list(CARD_NAMES)
 
-    shuffle(new_deck)
+    if rng is None:
+        from random import shuffle  # pylint: disable=C0415
+        shuffle(new_deck)
+    else:
+        rng.shuffle(new_deck)
 
     return new_deck
 
@@ -96,27 +113,68 @@ def print_three_card_piles(card_piles):
     print()
 
 
-def ask_player_for_chosen_card_pile():
-    """Asks player for chosen card pile, validates it and returns it as an int.
+CHOSEN_CARD_PILE_PROMPT = "Which number pile is your card in? "
+TWO_PILES_PROMPT = ("Please select 2 piles at random. "
+                    "(Seperate pile numbers with a space) ")
+ONE_PILE_PROMPT = "Please select a pile at random. "
+ONE_CARD_PROMPT = "Please select a card number. "
+
+
+def is_number(text):
+    """Checks that text is only the digits 0 to 9.
+
+    str.isdigit is also true for characters such as "²", which int can not
+    read, so the validators use this instead.
+    """
+    return text.isascii() and text.isdecimal()
+
+
+def check_chosen_card_pile(chosen_card_pile, number_of_piles=3):
+    """Validates an answer to CHOSEN_CARD_PILE_PROMPT.
+
+    Parameters
+    ----------
+    chosen_card_pile: The text the player entered.
+    number_of_piles: The number of piles the cards were dealt into.
 
     Returns
     -------
-    chosen_card_pile: The pile number of the users card as an integer.
+    chosen_card_pile: The pile number as an integer, or None after printing
+                      why the answer is not valid.
     """
-    while True:
-        chosen_card_pile = input("Which number pile is your card in? ")
+    if is_number(chosen_card_pile):
+        chosen_card_pile = int(chosen_card_pile)
 
-        if chosen_card_pile.isdigit():
-            chosen_card_pile = int(chosen_card_pile)
+        if 1 <= chosen_card_pile <= number_of_piles:
+            return int(chosen_card_pile)
 
-            if 1 <= chosen_card_pile <= 3:
-                return int(chosen_card_pile)
+        else:
+            print("Pile number has to be between 1 and " +
+                  str(number_of_piles) + ".")
 
-            else:
-                print("Pile number has to be between 1 and 3.")
+    else:
+        print("Only enter the number of the pile.")
 
-        else:
-            print("Only enter the number of the pile.")
+    return None
+
+
+def ask_player_for_chosen_card_pile(number_of_piles=3):
+    """Asks player for chosen card pile, validates it and returns it as an int.
+
+    Parameters
+    ----------
+    number_of_piles: The number of piles the cards were dealt into.
+
+    Returns
+    -------
+    chosen_card_pile: The pile number of the users card as an integer.
+    """
+    while True:
+        chosen_card_pile = check_chosen_card_pile(
+            input(CHOSEN_CARD_PILE_PROMPT), number_of_piles)
+
+        if chosen_card_pile is not None:
+            return chosen_card_pile
 
         print()
 
@@ -145,50 +203,67 @@ def pick_up_card_piles(chosen_card_pile, card_piles):
     return concentrated_card_pile
 
 
-# Start of the main game code.
+# Extra Credit
 
-deck = make_deck()
+"""
+1) Deal 11 cards face down into piles
+2) ask player to choose 2 piles
+3) delete or keep these piles
+4) continue until 2 piles left then ask for 1 pile Only
+5) With last pile ask player to choose a card
+6) Show them their card
 
-# TURN 1
-print()
+"""
 
-deck_fragment = deal_cards_into_3_columns(deck[0:21])
-print_three_card_piles(deck_fragment)
-pile_of_chosen_card = ask_player_for_chosen_card_pile()
-deck_fragment = pick_up_card_piles(pile_of_chosen_card, deck_fragment)
 
-# TURN 2
-print()
+# Everything print_card_pile_face_down prints for each tuple of pile
+# lengths, 0 for a removed pile, built the first time it is needed. Only
+# FACE_DOWN_CACHE_SIZE frames are kept, so other pile sizes can not grow the
+# dict without bound.
+FACE_DOWN_CACHE_SIZE = 256
+face_down_frames = {}
 
-deck_fragment = deal_cards_into_3_columns(deck_fragment)
-print_three_card_piles(deck_fragment)
-pile_of_chosen_card = ask_player_for_chosen_card_pile()
-deck_fragment = pick_up_card_piles(pile_of_chosen_card, deck_fragment)
 
-# TURN 3
-print()
+def format_face_down_cards(pile_length):
+    """Formats a pile of the given length face down with ? of ? notation.
 
-deck_fragment = deal_cards_into_3_columns(deck_fragment)
-print_three_card_piles(deck_fragment)
-pile_of_chosen_card = ask_player_for_chosen_card_pile()
+    Parameters
+    ----------
+    pile_length: The number of cards in the pile, 0 for a removed pile.
 
-print()
+    Returns
+    -------
+    face_down_cards: The face down cards seperated with ', '.
+    """
+    if pile_length == 0:
+        return ""
 
-print_three_card_piles(deck_fragment)
-deck_fragment = pick_up_card_piles(pile_of_chosen_card, deck_fragment)
+    return (" ? of ?, " * (pile_length - 1)) + " ? of ?"
 
 
-# Extra Credit
+def face_down_frame(pile_lengths):
+    """Returns the text print_card_pile_face_down prints for pile lengths.
 
-"""
-1) Deal 11 cards face down into piles
-2) ask player to choose 2 piles
-3) delete or keep these piles
-4) continue until 2 piles left then ask for 1 pile Only
-5) With last pile ask player to choose a card
-6) Show them their card
+    Parameters
+    ----------
+    pile_lengths: A tuple of the length of each pile, 0 for a removed pile.
 
-"""
+    Returns
+    -------
+    frame: One "Pile n: " line for each pile.
+    """
+    frame = face_down_frames.get(pile_lengths)
+
+    if frame is None:
+        frame = "".join("Pile " + str(pile_number) + ": " +
+                        format_face_down_cards(pile_length) + "\n"
+                        for pile_number, pile_length
+                        in enumerate(pile_lengths, 1))
+
+        if len(face_down_frames) < FACE_DOWN_CACHE_SIZE:
+            face_down_frames[pile_lengths] = frame
+
+    return frame
 
 
 def print_card_pile_face_down(card_piles):
@@ -198,64 +273,166 @@ def print_card_pile_face_down(card_piles):
     ----------
     card_piles: List containing all piles to format and print
     """
+    sys.stdout.write(face_down_frame(
+        tuple(0 if pile == [""] else len(pile) for pile in card_piles)))
+
+
+# The extra credit deals 5 face down piles and the chosen card is always in
+# the last one. Which piles are still on the table is kept as a bit mask
+# alongside the piles, bit i being set while pile i + 1 has not been removed.
+NUMBER_OF_FACE_DOWN_PILES = 5
+CARD_PILE_INDEX = 4
+ALL_FACE_DOWN_PILES = (1 << NUMBER_OF_FACE_DOWN_PILES) - 1
+
+# Where each face down pile comes from in deck_fragment, and where the
+# chosen card is in it after the three turns.
+PILE_SLICES = ((0, 3), (3, 5), (5, 7), (7, 9), (9, 11))
+CHOSEN_CARD_INDEX = 10
+
+
+def live_piles_mask(card_piles):
+    """Finds the bit mask of the piles which have not been removed.
+
+    Parameters
+    ----------
+    card_piles: List of all card piles, removed piles being [""].
+
+    Returns
+    -------
+    live_piles: An int with bit i set if pile i is still there.
+    """
+    live_piles = 0
+
     for index, pile in enumerate(card_piles):
-        if pile == [""]:
-            face_down_cards = ""
-        else:
-            face_down_cards = (" ? of ?, " * (len(pile) - 1)) + " ? of ?"
-        print("Pile " + str(index+1) + ": " + face_down_cards)
+        if pile != [""]:
+            live_piles |= 1 << index
 
+    return live_piles
 
-def ask_player_for_2_piles(card_piles):
-    """Asks player for 2 card piles, validates the input and returns it
+
+def piles_removed_by(piles_to_remove, live_piles):
+    """Finds the piles remove_piles takes away, as a bit mask.
 
     Parameters
     ----------
-    card_piles: All card piles as they exist to be used for error detection.
+    piles_to_remove: list or int containing indexes of the chosen piles.
+    live_piles: The bit mask of the piles still there.
 
     Returns
     -------
-    [chosen_pile_1, chosen_pile_2]: list of the 2 indexes of piles to remove.
+    removed_piles: The bit mask of the piles to remove.
+    """
+    if isinstance(piles_to_remove, list):
+        chosen_piles = 0
+        for index in piles_to_remove:
+            chosen_piles |= 1 << index
+    else:
+        chosen_piles = 1 << piles_to_remove
+
+    # Choosing the pile with the card keeps the chosen piles instead.
+    if chosen_piles & (1 << CARD_PILE_INDEX):
+        return live_piles & ~chosen_piles
+
+    return live_piles & chosen_piles
+
+
+def remove_piles_from_mask(piles_to_remove, live_piles):
+    """Removes piles like remove_piles, but only from the bit mask.
+
+    Parameters
+    ----------
+    piles_to_remove: list or int containing indexes of the chosen piles.
+    live_piles: The bit mask of the piles still there.
+
+    Returns
+    -------
+    live_piles: The bit mask with the piles removed.
     """
+    return live_piles & ~piles_removed_by(piles_to_remove, live_piles)
+
+
+def count_live_piles(live_piles):
+    """Counts the piles in a bit mask, like number_of_piles_remaining."""
+    return bin(live_piles).count("1")
 
-    while True:
-        chosen_card_piles = input("Please select 2 piles at random. "
-                                  "(Seperate pile numbers with a space) ")
 
-        # If input is 3 chars long and follows pattern [int][space][int].
-        if (len(chosen_card_piles) == 3 and
-                chosen_card_piles[0].isdigit() and
-                chosen_card_piles[1] == " " and
-                chosen_card_piles[2].isdigit()):
+def check_2_piles(chosen_card_piles, card_piles, live_piles=None):
+    """Validates an answer to TWO_PILES_PROMPT.
 
-            # Split user input into list of 2 numbers
-            chosen_card_piles = chosen_card_piles.split()
+    Parameters
+    ----------
+    chosen_card_piles: The text the player entered.
+    card_piles: All card piles as they exist to be used for error detection.
+    live_piles: Optional bit mask of the piles still there. It is found from
+                card_piles when not given.
+
+    Returns
+    -------
+    [chosen_pile_1, chosen_pile_2]: list of the 2 indexes of piles to remove,
+                                    or None after printing why the answer is
+                                    not valid.
+    """
+
+    # If input is 3 chars long and follows pattern [int][space][int].
+    if (len(chosen_card_piles) == 3 and
+            is_number(chosen_card_piles[0]) and
+            chosen_card_piles[1] == " " and
+            is_number(chosen_card_piles[2])):
 
-            # Change user input from pile numbers to pile index's
-            chosen_pile_1 = int(chosen_card_piles[0])-1
-            chosen_pile_2 = int(chosen_card_piles[1])-1
+        # Split user input into list of 2 numbers
+        chosen_card_piles = chosen_card_piles.split()
 
-            # if input more than 0 but not more than number of piles.
-            if ((0 <= chosen_pile_1 <= 4) and
-                    (0 <= chosen_pile_2 <= 4)):
+        # Change user input from pile numbers to pile index's
+        chosen_pile_1 = int(chosen_card_piles[0])-1
+        chosen_pile_2 = int(chosen_card_piles[1])-1
 
-                # If pile not empty (already removed)
-                if ((card_piles[chosen_pile_1] != [""]) and
-                        (card_piles[chosen_pile_2] != [""])):
-                    return [chosen_pile_1, chosen_pile_2]
+        # if input more than 0 but not more than number of piles.
+        if ((0 <= chosen_pile_1 <= 4) and
+                (0 <= chosen_pile_2 <= 4)):
 
-                else:
-                    print("The pile number you have entered has already been"
-                          "entered")
+            if live_piles is None:
+                live_piles = live_piles_mask(card_piles)
+
+            # If pile not empty (already removed)
+            if ((live_piles >> chosen_pile_1) & 1 and
+                    (live_piles >> chosen_pile_2) & 1):
+                return [chosen_pile_1, chosen_pile_2]
 
-            # If numbers not valid
             else:
-                print("Please check the card pile numbers you have entered.")
+                print("The pile number you have entered has already been"
+                      "entered")
 
-        # If input is not [int][space][int]
+        # If numbers not valid
         else:
-            print("Please format your input with your 2 chosen "
-                  "pile numbers seperated by a space")
+            print("Please check the card pile numbers you have entered.")
+
+    # If input is not [int][space][int]
+    else:
+        print("Please format your input with your 2 chosen "
+              "pile numbers seperated by a space")
+
+    return None
+
+
+def ask_player_for_2_piles(card_piles, live_piles=None):
+    """Asks player for 2 card piles, validates the input and returns it
+
+    Parameters
+    ----------
+    card_piles: All card piles as they exist to be used for error detection.
+    live_piles: Optional bit mask of the piles still there.
+
+    Returns
+    -------
+    [chosen_pile_1, chosen_pile_2]: list of the 2 indexes of piles to remove.
+    """
+
+    while True:
+        chosen_card_piles = check_2_piles(input(TWO_PILES_PROMPT), card_piles,
+                                          live_piles)
+
+        if chosen_card_piles is not None:
+            return chosen_card_piles
 
         print()
 
@@ -281,32 +458,25 @@ def remove_piles(piles_to_remove, all_card_piles):
     # If more than 1 pile to remove
     if isinstance(piles_to_remove, list):
 
-        if 4 in piles_to_remove:
+        if CARD_PILE_INDEX in piles_to_remove:
             print("All other piles will be removed. ")
 
-            for i in range(len(all_card_piles) - 1):
-                if i not in piles_to_remove:
-                    all_card_piles[i] = [""]
-
         else:
             print("These piles will be removed. ")
 
-            for i in range(len(all_card_piles) - 1):
-                if i in piles_to_remove:
-                    all_card_piles[i] = [""]
-
     else:
-        if piles_to_remove == 4:
+        if piles_to_remove == CARD_PILE_INDEX:
             print("The other pile will be removed. ")
 
-            for i in range(len(all_card_piles) - 1):
-                if i != piles_to_remove:
-                    all_card_piles[i] = [""]
-
         else:
             print("This pile will be removed. ")
 
-            all_card_piles[piles_to_remove] = [""]
+    removed_piles = piles_removed_by(piles_to_remove,
+                                     (1 << len(all_card_piles)) - 1)
+
+    for i in range(len(all_card_piles)):
+        if (removed_piles >> i) & 1:
+            all_card_piles[i] = [""]
 
     print()
     return all_card_piles
@@ -332,125 +502,308 @@ def number_of_piles_remaining(all_card_piles):
     return count
 
 
-def ask_player_for_1_pile(card_piles):
-    """Asks player for 1 card pile, validates the input and returns it
+def check_1_pile(chosen_card_pile, card_piles, live_piles=None):
+    """Validates an answer to ONE_PILE_PROMPT.
 
     Parameters
     ----------
+    chosen_card_pile: The text the player entered.
     card_piles: List of all card piles.
+    live_piles: Optional bit mask of the piles still there. It is found from
+                card_piles when not given.
 
     Returns
     -------
-    chosen_card_pile:
+    chosen_card_pile: The index of the chosen pile, or None after printing
+                      why the answer is not valid.
     """
 
-    while True:
-        chosen_card_pile = input("Please select a pile at random. ")
-
-        # If input is a number
-        if chosen_card_pile.isdigit():
+    # If input is a number
+    if is_number(chosen_card_pile):
 
-            chosen_card_pile = int(chosen_card_pile) - 1
+        chosen_card_pile = int(chosen_card_pile) - 1
 
-            # if input more than 0 but not more than number of piles.
-            if 0 <= chosen_card_pile <= 4:
+        # if input more than 0 but not more than number of piles.
+        if 0 <= chosen_card_pile <= 4:
 
-                # If card pile not empty
-                if card_piles[chosen_card_pile] != [""]:
+            if live_piles is None:
+                live_piles = live_piles_mask(card_piles)
 
-                    return chosen_card_pile
+            # If card pile not empty
+            if (live_piles >> chosen_card_pile) & 1:
 
-                else:
-                    print("The pile number you have entered has already been"
-                          "entered")
+                return chosen_card_pile
 
-            # If number's not valid
             else:
-                print("Please check the card pile number you have entered.")
+                print("The pile number you have entered has already been"
+                      "entered")
 
-        # If input is not a number
+        # If number's not valid
         else:
-            print("Only enter the number of the pile.")
+            print("Please check the card pile number you have entered.")
+
+    # If input is not a number
+    else:
+        print("Only enter the number of the pile.")
+
+    return None
+
+
+def ask_player_for_1_pile(card_piles, live_piles=None):
+    """Asks player for 1 card pile, validates the input and returns it
+
+    Parameters
+    ----------
+    card_piles: List of all card piles.
+    live_piles: Optional bit mask of the piles still there.
+
+    Returns
+    -------
+    chosen_card_pile:
+    """
+
+    while True:
+        chosen_card_pile = check_1_pile(input(ONE_PILE_PROMPT), card_piles,
+                                        live_piles)
+
+        if chosen_card_pile is not None:
+            return chosen_card_pile
 
         print()
 
 
+# The text of print_2_cards, and of print_last_card_removal for card 1 and
+# for the other card. Neither depends on the cards.
+TWO_CARDS_TEXT = "Card 1: ? of ?\nCard 2: ? of ?\n\n"
+LAST_CARD_REMOVAL_TEXTS = (
+    "This card will be removed. \n\nCard 1: \nCard 2: ? of ?\n\n",
+    "The other card will be removed. \n\nCard 1: \nCard 2: ? of ?\n\n")
+
+
 def print_2_cards():
-    print("Card 1: ? of ?")
-    print("Card 2: ? of ?")
-    print()
+    sys.stdout.write(TWO_CARDS_TEXT)
 
 
-def ask_player_for_1_card():
+def check_1_card(chosen_card):
+    """Validates an answer to ONE_CARD_PROMPT.
 
-    while True:
-        chosen_card = input("Please select a card number. ")
+    Parameters
+    ----------
+    chosen_card: The text the player entered.
 
-        # If input is a number
-        if chosen_card.isdigit():
+    Returns
+    -------
+    chosen_card: The index of the chosen card, or None after printing why
+                 the answer is not valid.
+    """
 
-            chosen_card = int(chosen_card) - 1
+    # If input is a number
+    if is_number(chosen_card):
 
-            # if input 0 or 1.
-            if chosen_card == 0 or 1:
+        chosen_card = int(chosen_card) - 1
 
-                return chosen_card
+        # if input 0 or 1.
+        if chosen_card == 0 or 1:
 
-            # If number's not valid
-            else:
-                print("Please check the card number you have entered.")
+            return chosen_card
 
-        # If input is not a number
+        # If number's not valid
         else:
-            print("Only enter the number of the card.")
+            print("Please check the card number you have entered.")
+
+    # If input is not a number
+    else:
+        print("Only enter the number of the card.")
+
+    return None
+
+
+def ask_player_for_1_card():
+
+    while True:
+        chosen_card = check_1_card(input(ONE_CARD_PROMPT))
+
+        if chosen_card is not None:
+            return chosen_card
 
         print()
 
 
 def print_last_card_removal(card_to_remove):
-    if card_to_remove == 0:
-        print("This card will be removed. ")
-    else:
-        print("The other card will be removed. ")
+    sys.stdout.write(LAST_CARD_REMOVAL_TEXTS[card_to_remove != 0])
 
-    print()
-    print("Card 1: ")
-    print("Card 2: ? of ?")
+
+# Start of the main game code.
+
+# Set by trick_timing to time each phase of the game. While it is None a
+# timed phase costs one call and a global lookup.
+phase_timer = None
+
+
+class _NoTiming:
+    """Stands in for a timed phase while timing is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMING = _NoTiming()
+
+
+def timed_phase(name):
+    """Times the block it is used with as one phase of the game.
+
+    Parameters
+    ----------
+    name: The name of the phase, e.g. "deal" or "player".
+
+    Returns
+    -------
+    context: A context manager recording the phase in phase_timer, or doing
+             nothing when timing is off.
+    """
+    if phase_timer is None:
+        return _NO_TIMING
+
+    return phase_timer.phase(name)
+
+
+def play_twenty_one(deck):
+    """Plays the three turns of the trick with the player.
+
+    Parameters
+    ----------
+    deck: A list of at least 21 cards, e.g. from make_deck.
+
+    Returns
+    -------
+    deck_fragment: A list of the 21 cards after the last pick up, with the
+                   chosen card at index 10.
+    """
+    # TURN 1
+    with timed_phase("turn_1"):
+        print()
+
+        with timed_phase("deal"):
+            deck_fragment = deal_cards_into_3_columns(deck[0:21])
+            print_three_card_piles(deck_fragment)
+
+        with timed_phase("player"):
+            pile_of_chosen_card = ask_player_for_chosen_card_pile()
+
+        with timed_phase("pick_up"):
+            deck_fragment = pick_up_card_piles(pile_of_chosen_card,
+                                               deck_fragment)
+
+    # TURN 2
+    with timed_phase("turn_2"):
+        print()
+
+        with timed_phase("deal"):
+            deck_fragment = deal_cards_into_3_columns(deck_fragment)
+            print_three_card_piles(deck_fragment)
+
+        with timed_phase("player"):
+            pile_of_chosen_card = ask_player_for_chosen_card_pile()
+
+        with timed_phase("pick_up"):
+            deck_fragment = pick_up_card_piles(pile_of_chosen_card,
+                                               deck_fragment)
+
+    # TURN 3
+    with timed_phase("turn_3"):
+        print()
+
+        with timed_phase("deal"):
+            deck_fragment = deal_cards_into_3_columns(deck_fragment)
+            print_three_card_piles(deck_fragment)
+
+        with timed_phase("player"):
+            pile_of_chosen_card = ask_player_for_chosen_card_pile()
+
+        print()
+        print_three_card_piles(deck_fragment)
+
+        with timed_phase("pick_up"):
+            deck_fragment = pick_up_card_piles(pile_of_chosen_card,
+                                               deck_fragment)
+
+    return deck_fragment
+
+
+def play_extra_credit(deck_fragment):
+    """Finds the chosen card again by removing face down piles.
+
+    Parameters
+    ----------
+    deck_fragment: A list of the 21 cards with the chosen card at index 10.
+    """
+    with timed_phase("deal"):
+        card_piles = [deck_fragment[start:end] for start, end in PILE_SLICES]
+        live_piles = ALL_FACE_DOWN_PILES
+        print_card_pile_face_down(card_piles)
+
+    # Each elimination removes the piles the player chose and shows the
+    # piles left, so the wait for the player is never part of it.
+    while count_live_piles(live_piles) > 2:
+
+        with timed_phase("player"):
+            chosen_piles = ask_player_for_2_piles(card_piles, live_piles)
+
+        with timed_phase("elimination"):
+            card_piles = remove_piles(chosen_piles, card_piles)
+            live_piles = remove_piles_from_mask(chosen_piles, live_piles)
+            print_card_pile_face_down(card_piles)
+
+    if count_live_piles(live_piles) != 1:
+
+        with timed_phase("player"):
+            chosen_piles = ask_player_for_1_pile(card_piles, live_piles)
+
+        with timed_phase("elimination"):
+            card_piles = remove_piles(chosen_piles, card_piles)
+            live_piles = remove_piles_from_mask(chosen_piles, live_piles)
+            print_card_pile_face_down(card_piles)
+
+    the_card_pile = card_piles[CARD_PILE_INDEX]
+
+    print("Only one pile remaining. Now I will find your card. ")
     print()
 
-print()
-print(deck_fragment[10])
-print()
+    print_2_cards()
+    with timed_phase("player"):
+        chosen_card = ask_player_for_1_card()
 
-card_piles = [deck_fragment[0:3], deck_fragment[3:5], deck_fragment[5:7],
-              deck_fragment[7:9], deck_fragment[9:11]]
+    with timed_phase("reveal"):
+        print_last_card_removal(chosen_card)
 
-print_card_pile_face_down(card_piles)
-chosen_piles = ask_player_for_2_piles(card_piles)
-card_piles = remove_piles(chosen_piles, card_piles)
+        print("There is only one card left...")
+        print("Your card is", the_card_pile[1])
 
-while number_of_piles_remaining(card_piles) > 2:
 
-    print_card_pile_face_down(card_piles)
-    chosen_piles = ask_player_for_2_piles(card_piles)
-    card_piles = remove_piles(chosen_piles, card_piles)
+def main():
+    """Plays the whole trick, including the extra credit, in the terminal.
 
-if number_of_piles_remaining(card_piles) != 1:
+    Output is buffered with trick_render, so each turn is written to the
+    terminal at once when input() shows the prompt.
+    """
+    from trick_render import render_frames  # pylint: disable=C0415
 
-    print_card_pile_face_down(card_piles)
-    chosen_piles = ask_player_for_1_pile(card_piles)
-    card_piles = remove_piles(chosen_piles, card_piles)
+    deck = make_deck()
 
-the_card_pile = card_piles[4]
+    with render_frames():
+        deck_fragment = play_twenty_one(deck)
 
-print_card_pile_face_down(card_piles)
+        with timed_phase("final_card"):
+            print()
+            print(deck_fragment[10])
+            print()
 
-print("Only one pile remaining. Now I will find your card. ")
-print()
+        play_extra_credit(deck_fragment)
 
-print_2_cards()
-chosen_card = ask_player_for_1_card()
-print_last_card_removal(chosen_card)
 
-print("There is only one card left...")
-print("Your card is", the_card_pile[1])
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Checks that importing card_trick stays within an import time budget.
+
+Worker processes import card_trick to reuse its functions, so the import has
+to stay cheap. This runs python -X importtime in fresh processes and compares
+the best cumulative time of the module against the budget:
+
+    python check_import_time.py --budget 2000 card_trick
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+DEFAULT_BUDGET_US = 2000
+
+
+def measure_import_time(module_name, repeat=5):
+    """Measures how long a module takes to import in a new interpreter.
+
+    The first run is a warmup which also writes the module's bytecode cache,
+    so compiling the source is not counted.
+
+    Parameters
+    ----------
+    module_name: The name of the module to import.
+    repeat: The number of measured runs.
+
+    Returns
+    -------
+    best_us: The lowest cumulative import time, in microseconds.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-X", "importtime", "-c",
+               "import " + module_name]
+
+    timings = []
+
+    for _ in range(repeat + 1):
+        result = subprocess.run(command, env=env, stderr=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+
+        for line in result.stderr.splitlines():
+            fields = [field.strip() for field in line.split("|")]
+
+            if len(fields) == 3 and fields[2] == module_name:
+                timings.append(int(fields[1]))
+
+    # Drop the warmup run.
+    return min(timings[1:])
+
+
+def main(argv=None):
+    """Prints the import time of each module and fails if over budget."""
+    parser = argparse.ArgumentParser(
+        description="Check module import times against a budget.")
+    parser.add_argument("modules", nargs="*", default=["card_trick"])
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET_US,
+                        help="budget for each module in microseconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    over_budget = False
+
+    for module_name in args.modules:
+        best_us = measure_import_time(module_name, args.repeat)
+        status = "ok"
+
+        if best_us > args.budget:
+            status = "OVER BUDGET"
+            over_budget = True
+
+        print(module_name + ": " + str(best_us) + " us (budget " +
+              str(args.budget) + " us) " + status)
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
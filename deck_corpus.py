@@ -0,0 +1,178 @@
+"""File of pre-shuffled decks for reproducible load tests.
+
+make_deck shuffles a new deck for every session, so two load test runs never
+play the same decks, and the shuffling is part of what gets timed. A corpus
+is made once instead: a short header then one RECORD_SIZE byte record per
+deck, each the 52 card numbers of a shuffled deck (see card_encoding).
+
+A DeckCorpus maps the file with mmap and each deck is a memoryview of its
+record, so reading a deck copies nothing. The trick_engine batch runners
+deal encoded decks unchanged, so they can run straight from the corpus, and
+trick_server can deal its sessions from the same file:
+
+    python deck_corpus.py decks.bin 1000000 --seed 1
+    python trick_engine.py 1000000 --corpus decks.bin
+    python trick_server.py --corpus decks.bin
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import mmap
+import random
+import struct
+
+from card_trick import CARD_NAMES
+from card_encoding import decode_cards
+
+
+CORPUS_MAGIC = b"21DK"
+CORPUS_VERSION = 1
+
+# Header layout: magic, version, record size.
+HEADER_FORMAT = struct.Struct("<4sHH")
+RECORD_SIZE = len(CARD_NAMES)
+
+# Decks shuffled before each write while making a corpus.
+WRITE_CHUNK = 4096
+
+
+def write_corpus(path, number_of_decks, seed=None):
+    """Writes a corpus of shuffled decks.
+
+    Parameters
+    ----------
+    path: The file to write, replaced if it exists.
+    number_of_decks: The number of decks to shuffle.
+    seed: Optional seed so the same corpus can be made again.
+    """
+    rng = random.Random(seed)
+    deck = bytearray(range(RECORD_SIZE))
+
+    with open(path, "wb") as corpus_file:
+        corpus_file.write(HEADER_FORMAT.pack(CORPUS_MAGIC, CORPUS_VERSION,
+                                             RECORD_SIZE))
+
+        for start in range(0, number_of_decks, WRITE_CHUNK):
+            chunk = bytearray()
+
+            for _ in range(min(WRITE_CHUNK, number_of_decks - start)):
+                rng.shuffle(deck)
+                chunk += deck
+
+            corpus_file.write(chunk)
+
+
+class DeckCorpus:
+    """A read only, memory mapped corpus of decks.
+
+    It is a sequence of decks: len(corpus) is the number of decks and
+    corpus[index] is a memoryview of the 52 card numbers of one deck. The
+    views point into the file, so they have to be released before the
+    corpus is closed.
+
+    Parameters
+    ----------
+    path: The corpus file, made by write_corpus.
+
+    Raises
+    ------
+    ValueError: If the file is not a corpus this version can read, or has
+                no decks to deal.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as corpus_file:
+            self._map = mmap.mmap(corpus_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER_FORMAT.size:
+            self._map.close()
+            raise ValueError("Not a deck corpus: " + str(path))
+
+        magic, version, record_size = HEADER_FORMAT.unpack_from(self._map)
+
+        if (magic != CORPUS_MAGIC or version != CORPUS_VERSION or
+                record_size != RECORD_SIZE):
+            self._map.close()
+            raise ValueError("Not a deck corpus this version can read: " +
+                             str(path))
+
+        self.view = memoryview(self._map)[HEADER_FORMAT.size:]
+        self._length = len(self.view) // RECORD_SIZE
+
+        if self._length == 0:
+            # deck and decks wrap around the corpus, which needs a deck.
+            self.view.release()
+            self._map.close()
+            raise ValueError("Deck corpus has no decks: " + str(path))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+
+        if not 0 <= index < self._length:
+            raise IndexError("deck index out of range")
+
+        start = index * RECORD_SIZE
+
+        return self.view[start:start + RECORD_SIZE]
+
+    def deck(self, index):
+        """Returns a deck as a list of card names, e.g. for a TrickSession.
+
+        The index wraps around, so a corpus can deal any number of sessions.
+        """
+        return decode_cards(self[index % self._length])
+
+    def decks(self, number_of_decks, start=0):
+        """Returns encoded decks for a batch, wrapping around the corpus.
+
+        Parameters
+        ----------
+        number_of_decks: The number of decks wanted.
+        start: The index of the first deck.
+
+        Returns
+        -------
+        decks: A list of memoryviews, one for each deck.
+        """
+        return [self[(start + offset) % self._length]
+                for offset in range(number_of_decks)]
+
+    def close(self):
+        """Unmaps the file."""
+        self.view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def main(argv=None):
+    """Writes a corpus from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Write a file of pre-shuffled decks.")
+    parser.add_argument("path", help="the corpus file to write")
+    parser.add_argument("decks", type=int, nargs="?", default=1000000,
+                        help="number of decks to shuffle")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    write_corpus(args.path, args.decks, args.seed)
+
+    print("Wrote " + str(args.decks) + " decks to " + args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Exhaustive check of every way to play the extra credit.
+
+The extra credit (ask_player_for_2_piles, the remove_piles loop,
+ask_player_for_1_pile, ask_player_for_1_card and print_last_card_removal)
+only depends on which face down piles are left, so its whole input space is
+a small graph of pile states. This explores every legal answer from every
+state with the real validators and remove_piles, sharing the result of each
+state between all the paths reaching it. It checks that the revealed card is
+always the chosen one, counts how many prompts each path takes, and flags
+any path where the hard coded card_piles[4] and the_card_pile[1] would not
+hold:
+
+    python elimination_explorer.py
+"""
+
+# pylint: disable=C0103
+
+import os
+from collections import Counter
+from contextlib import redirect_stdout
+
+from card_trick import (check_2_piles, check_1_pile, check_1_card,
+                        remove_piles, live_piles_mask, remove_piles_from_mask,
+                        count_live_piles, ALL_FACE_DOWN_PILES,
+                        CARD_PILE_INDEX, PILE_SLICES, CHOSEN_CARD_INDEX)
+
+
+# The prompt each state of the extra credit is waiting on.
+TWO_PILES, ONE_PILE, ONE_CARD = "two_piles", "one_pile", "one_card"
+
+# Every answer in the format the validators accept, legal or not.
+TWO_PILE_ANSWERS = tuple(str(first) + " " + str(second)
+                         for first in range(10) for second in range(10))
+ONE_DIGIT_ANSWERS = tuple(str(number) for number in range(10))
+
+
+class ExplorationResult:
+    """What every path from one state of the extra credit leads to.
+
+    Attributes
+    ----------
+    prompts: A Counter of the number of prompts still to come to the number
+             of paths taking that many.
+    flags: A dict of each broken assumption of the game to the number of
+           paths from this state which break it and the first such path's
+           answers.
+    """
+
+    __slots__ = ("prompts", "flags")
+
+    def __init__(self):
+        self.prompts = Counter()
+        self.flags = {}
+
+    def flag(self, problem, answers, paths=1):
+        """Records paths which break an assumption."""
+        count, example = self.flags.get(problem, (0, answers))
+        self.flags[problem] = (count + paths, min(example, answers))
+
+    @property
+    def paths(self):
+        """The number of legal answer sequences from this state."""
+        return sum(self.prompts.values())
+
+
+def card_piles_for(live_piles):
+    """Builds the face down piles for a bit mask of live piles.
+
+    The cards are the positions in deck_fragment, so the chosen card is
+    CHOSEN_CARD_INDEX.
+    """
+    deck_fragment = list(range(21))
+
+    return [deck_fragment[start:end] if (live_piles >> index) & 1 else [""]
+            for index, (start, end) in enumerate(PILE_SLICES)]
+
+
+def _legal_answers(state, card_piles, live_piles):
+    """Finds the answers the real validators accept in a state.
+
+    Returns
+    -------
+    answers: A list of (answer text, validated value).
+    """
+    answers = []
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if state == TWO_PILES:
+            for answer in TWO_PILE_ANSWERS:
+                chosen_piles = check_2_piles(answer, card_piles, live_piles)
+                if chosen_piles is not None:
+                    answers.append((answer, chosen_piles))
+
+        elif state == ONE_PILE:
+            for answer in ONE_DIGIT_ANSWERS:
+                chosen_pile = check_1_pile(answer, card_piles, live_piles)
+                if chosen_pile is not None:
+                    answers.append((answer, chosen_pile))
+
+        else:
+            for answer in ONE_DIGIT_ANSWERS:
+                chosen_card = check_1_card(answer)
+                if chosen_card is not None:
+                    answers.append((answer, chosen_card))
+
+    return answers
+
+
+def _remove(chosen_piles, live_piles, result, answer):
+    """Removes piles with remove_piles and checks the bit mask agrees."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        card_piles = remove_piles(chosen_piles, card_piles_for(live_piles))
+
+    new_live_piles = live_piles_mask(card_piles)
+
+    if new_live_piles != remove_piles_from_mask(chosen_piles, live_piles):
+        result.flag("remove_piles and remove_piles_from_mask disagree",
+                    (answer,))
+
+    return new_live_piles
+
+
+def _next_state(live_piles):
+    """Finds the prompt play_extra_credit shows after a removal."""
+    if count_live_piles(live_piles) > 2:
+        return TWO_PILES
+
+    if count_live_piles(live_piles) != 1:
+        return ONE_PILE
+
+    return ONE_CARD
+
+
+def _check_reveal(live_piles, chosen_card, result, answer):
+    """Checks the reveal of the_card_pile[1] at the end of a path."""
+    if count_live_piles(live_piles) != 1:
+        result.flag("more than one pile left at the reveal", (answer,))
+
+    if chosen_card not in (0, 1):
+        result.flag("ask_player_for_1_card accepts card numbers other than "
+                    "1 and 2", (answer,))
+
+    if not (live_piles >> CARD_PILE_INDEX) & 1:
+        result.flag("card_piles[4] was removed", (answer,))
+        return
+
+    the_card_pile = card_piles_for(live_piles)[CARD_PILE_INDEX]
+
+    if the_card_pile[1] != CHOSEN_CARD_INDEX:
+        result.flag("the_card_pile[1] is not the chosen card", (answer,))
+
+
+def explore(state=TWO_PILES, live_piles=ALL_FACE_DOWN_PILES, memo=None):
+    """Explores every legal path from a state of the extra credit.
+
+    Parameters
+    ----------
+    state: The prompt being shown, TWO_PILES, ONE_PILE or ONE_CARD.
+    live_piles: The bit mask of the piles still there.
+    memo: Optional dict of results already found, keyed by
+          (state, live_piles). It is filled in as states are explored.
+
+    Returns
+    -------
+    result: An ExplorationResult for the state.
+    """
+    if memo is None:
+        memo = {}
+
+    key = (state, live_piles)
+
+    if key in memo:
+        return memo[key]
+
+    result = ExplorationResult()
+    card_piles = card_piles_for(live_piles)
+
+    for answer, value in _legal_answers(state, card_piles, live_piles):
+        if state == ONE_CARD:
+            _check_reveal(live_piles, value, result, answer)
+            result.prompts[1] += 1
+            continue
+
+        new_live_piles = _remove(value, live_piles, result, answer)
+        next_result = explore(_next_state(new_live_piles), new_live_piles,
+                              memo)
+
+        for prompts, paths in next_result.prompts.items():
+            result.prompts[prompts + 1] += paths
+
+        for problem, (paths, answers) in next_result.flags.items():
+            result.flag(problem, (answer,) + answers, paths)
+
+    memo[key] = result
+
+    return result
+
+
+def main():
+    """Explores the whole extra credit and prints a report."""
+    memo = {}
+    result = explore(memo=memo)
+
+    print(str(result.paths) + " answer sequences the validators accept, "
+          "through " + str(len(memo)) + " distinct states")
+    print("Prompts per session:")
+
+    for prompts in sorted(result.prompts):
+        print("  " + str(prompts) + ": " + str(result.prompts[prompts]) +
+              " sequences")
+
+    if not any(problem.startswith(("card_piles", "the_card_pile"))
+               for problem in result.flags):
+        print("The revealed card is always the chosen card.")
+
+    if not result.flags:
+        return 0
+
+    print("Flagged:")
+
+    for problem, (paths, answers) in sorted(result.flags.items()):
+        print("  " + problem + " (" + str(paths) + " sequences, e.g. " +
+              " / ".join(answers) + ")")
+
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,609 @@
+"""Generalized trick engine for any number of columns, rows and rounds.
+
+The 'Twenty One' trick deals 21 cards into 3 columns of 7 three times. The
+same trick works for other layouts, e.g. 27 cards in 3 columns of 9 or 25
+cards in 5 columns of 5, as long as there are enough rounds for the chosen
+card to settle.
+
+After a pick up the chosen pile is in the middle, so a card at position p
+moves to position middle * rows + p // columns. Following the lowest and
+highest possible positions through the rounds gives the guaranteed final
+index, or shows there is none, without dealing any cards. Going the other
+way, each pile answer is one base columns digit of the card's position, so
+the player's answers give the card they chose without rebuilding the piles.
+
+A CandidateSet follows the positions the card can still be at as a bit
+mask, one bit per card, narrowed by each answer's column mask. It spots
+answers no card could give as soon as they are given, and knows the card as
+soon as one position is left, which in some layouts is before the last
+round.
+
+The same interval shows the fewest rounds a layout needs, so an
+adaptive_layout deals only as many rounds as its columns and rows need,
+e.g. 2 for 25 cards in 5 columns instead of a fixed 3.
+
+Run this module directly to check a layout against simulation, with the
+fewest rounds unless --rounds is given:
+
+    python general_trick.py --columns 5 --rows 5
+"""
+
+# pylint: disable=C0103
+
+import argparse
+from collections import namedtuple
+from functools import lru_cache
+
+
+class TrickLayout(namedtuple("TrickLayout", "columns rows rounds")):
+    """The number of columns, rows and rounds of one form of the trick."""
+
+    __slots__ = ()
+
+    @property
+    def number_of_cards(self):
+        """The number of cards dealt, columns * rows."""
+        return self.columns * self.rows
+
+    @property
+    def middle_pile(self):
+        """The index of the pile the chosen pile is picked up as."""
+        return self.columns // 2
+
+
+TWENTY_ONE = TrickLayout(columns=3, rows=7, rounds=3)
+
+
+def check_layout(layout):
+    """Checks that a layout can be dealt.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Raises
+    ------
+    ValueError: If there are fewer than 2 columns, 1 row or 1 round.
+    """
+    if layout.columns < 2:
+        raise ValueError("A layout needs at least 2 columns.")
+
+    if layout.rows < 1:
+        raise ValueError("A layout needs at least 1 row.")
+
+    if layout.rounds < 1:
+        raise ValueError("A layout needs at least 1 round.")
+
+
+def deal_cards_into_columns(card_pile, columns):
+    """Deals cards row by row into the given number of columns.
+
+    This is deal_cards_into_3_columns for any number of columns, done with
+    one slice per column so it stays linear in the number of cards.
+
+    Parameters
+    ----------
+    card_pile: A list containing columns * rows cards.
+    columns: The number of columns to deal into.
+
+    Returns
+    -------
+    card_piles: A 2d list containing the columns.
+    """
+    return [card_pile[column::columns] for column in range(columns)]
+
+
+def pick_up_columns(chosen_card_pile, card_piles):
+    """Picks up the columns with the chosen one in the middle.
+
+    The other piles keep their order around it, which for 3 piles is the
+    same as pick_up_card_piles.
+
+    Parameters
+    ----------
+    chosen_card_pile: The pile number (1 to number of piles) which contains
+                      the users card.
+    card_piles: The list of all the card piles.
+
+    Returns
+    -------
+    concentrated_card_pile: A list that joins the card piles, with the pile
+                            that contains the users card in the middle.
+    """
+    if not 1 <= chosen_card_pile <= len(card_piles):
+        raise ValueError("Pile number has to be between 1 and " +
+                         str(len(card_piles)) + ".")
+
+    other_piles = (card_piles[:chosen_card_pile - 1] +
+                   card_piles[chosen_card_pile:])
+    other_piles.insert(len(card_piles) // 2, card_piles[chosen_card_pile - 1])
+
+    concentrated_card_pile = []
+    for pile in other_piles:
+        concentrated_card_pile.extend(pile)
+
+    return concentrated_card_pile
+
+
+def run_general_session(layout, pile_choices, card_pile):
+    """Runs one scripted session of a generalized trick.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    pile_choices: A sequence of pile numbers, one for each round.
+    card_pile: A list of at least layout.number_of_cards cards.
+
+    Returns
+    -------
+    card_pile: A list of the cards after the last pick up.
+    """
+    check_layout(layout)
+
+    if len(pile_choices) != layout.rounds:
+        raise ValueError("Expected " + str(layout.rounds) +
+                         " pile choices, got " + str(len(pile_choices)) + ".")
+
+    card_pile = list(card_pile[0:layout.number_of_cards])
+
+    for pile_of_chosen_card in pile_choices:
+        card_piles = deal_cards_into_columns(card_pile, layout.columns)
+        card_pile = pick_up_columns(pile_of_chosen_card, card_piles)
+
+    return card_pile
+
+
+def next_position(layout, position):
+    """Finds where the chosen card moves to in one deal and pick up."""
+    return layout.middle_pile * layout.rows + position // layout.columns
+
+
+def possible_positions(layout, rounds=None):
+    """Finds the lowest and highest position the chosen card can be in.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    rounds: The number of rounds to follow, layout.rounds by default.
+
+    Returns
+    -------
+    (lowest, highest): The range of positions the card can be in after the
+                       rounds, whatever card was chosen.
+    """
+    check_layout(layout)
+
+    if rounds is None:
+        rounds = layout.rounds
+
+    lowest, highest = 0, layout.number_of_cards - 1
+
+    for _ in range(rounds):
+        lowest = next_position(layout, lowest)
+        highest = next_position(layout, highest)
+
+    return lowest, highest
+
+
+def predict_final_index(layout):
+    """Finds the index the chosen card is guaranteed to end at.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Returns
+    -------
+    final_index: The index of the chosen card after the last pick up, or
+                 None if the layout does not have enough rounds to fix it.
+    """
+    lowest, highest = possible_positions(layout)
+
+    if lowest == highest:
+        return lowest
+
+    return None
+
+
+def minimum_rounds(layout):
+    """Finds the fewest rounds which give a guaranteed final index.
+
+    Parameters
+    ----------
+    layout: A TrickLayout. Its number of rounds is not used.
+
+    Returns
+    -------
+    rounds: The number of rounds after which every card ends at the same
+            index, or None if the positions stop converging first.
+    """
+    check_layout(layout)
+
+    lowest, highest = 0, layout.number_of_cards - 1
+    rounds = 0
+
+    while lowest != highest:
+        next_lowest = next_position(layout, lowest)
+        next_highest = next_position(layout, highest)
+
+        if (next_lowest, next_highest) == (lowest, highest):
+            return None
+
+        lowest, highest = next_lowest, next_highest
+        rounds += 1
+
+    return rounds
+
+
+def adaptive_layout(columns, rows):
+    """Makes the layout with the fewest rounds for its columns and rows.
+
+    Raises
+    ------
+    ValueError: If the layout can not be dealt, or no number of rounds
+                gives it a guaranteed final index.
+    """
+    rounds = minimum_rounds(TrickLayout(columns, rows, 1))
+
+    if rounds is None:
+        raise ValueError(str(columns * rows) + " cards in " + str(columns) +
+                         " columns never settle on one index.")
+
+    return TrickLayout(columns, rows, max(1, rounds))
+
+
+def final_position(layout, initial_position):
+    """Finds where a card ends after all the rounds, without dealing.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    initial_position: The index of the card in the first deal.
+
+    Returns
+    -------
+    position: The index of the card after the last pick up.
+    """
+    check_layout(layout)
+
+    if not 0 <= initial_position < layout.number_of_cards:
+        raise ValueError("Position has to be between 0 and " +
+                         str(layout.number_of_cards - 1) + ".")
+
+    position = initial_position
+
+    for _ in range(layout.rounds):
+        position = next_position(layout, position)
+
+    return position
+
+
+def solve_initial_position(layout, pile_choices):
+    """Finds the first position of the chosen card from the pile answers.
+
+    Starting from the guaranteed final index, each answer, read from the
+    last round back to the first, gives the column the card was dealt into
+    and so the lowest digit of its position before that round.
+
+    Parameters
+    ----------
+    layout: A TrickLayout with a guaranteed final index.
+    pile_choices: A sequence of pile numbers, one for each round.
+
+    Returns
+    -------
+    position: The index of the chosen card in the first deal.
+
+    Raises
+    ------
+    ValueError: If the layout has no guaranteed final index, or if no card
+                could have been in all of the chosen piles.
+    """
+    final_index = predict_final_index(layout)
+
+    if final_index is None:
+        raise ValueError(str(layout) + " has no guaranteed final index.")
+
+    if len(pile_choices) != layout.rounds:
+        raise ValueError("Expected " + str(layout.rounds) +
+                         " pile choices, got " + str(len(pile_choices)) + ".")
+
+    position = final_index
+
+    for pile_of_chosen_card in reversed(pile_choices):
+        if not 1 <= pile_of_chosen_card <= layout.columns:
+            raise ValueError("Pile number has to be between 1 and " +
+                             str(layout.columns) + ".")
+
+        row = position - layout.middle_pile * layout.rows
+        position = row * layout.columns + pile_of_chosen_card - 1
+
+        if not 0 <= position < layout.number_of_cards:
+            raise ValueError("No card is in all of the piles " +
+                             str(list(pile_choices)) + ".")
+
+    return position
+
+
+def reveal_card(layout, pile_choices, card_pile):
+    """Finds the chosen card from the pile answers alone.
+
+    Parameters
+    ----------
+    layout: A TrickLayout with a guaranteed final index.
+    pile_choices: A sequence of pile numbers, one for each round.
+    card_pile: The cards in the order of the first deal.
+
+    Returns
+    -------
+    card: The card the player chose.
+    """
+    return card_pile[solve_initial_position(layout, pile_choices)]
+
+
+@lru_cache(maxsize=None)
+def column_masks(layout):
+    """Finds the bit mask of the positions dealt into each column.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Returns
+    -------
+    masks: A tuple with one int per column, bit p set if position p is
+           dealt into that column.
+    """
+    check_layout(layout)
+    masks = [0] * layout.columns
+
+    for position in range(layout.number_of_cards):
+        masks[position % layout.columns] |= 1 << position
+
+    return tuple(masks)
+
+
+def pick_up_candidates(layout, candidates):
+    """Moves a mask of positions in the chosen column through a pick up."""
+    picked_up = 0
+
+    while candidates:
+        lowest_bit = candidates & -candidates
+        position = lowest_bit.bit_length() - 1
+        picked_up |= 1 << next_position(layout, position)
+        candidates ^= lowest_bit
+
+    return picked_up
+
+
+class CandidateSet:
+    """The positions the chosen card can be at, as a bit mask.
+
+    It starts with every position, and each pile answer keeps the positions
+    in that pile then moves them through the pick up.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    """
+
+    __slots__ = ("layout", "candidates", "rounds_played")
+
+    def __init__(self, layout):
+        check_layout(layout)
+
+        self.layout = layout
+        self.candidates = (1 << layout.number_of_cards) - 1
+        self.rounds_played = 0
+
+    @property
+    def remaining(self):
+        """The number of positions the card can still be at."""
+        return bin(self.candidates).count("1")
+
+    @property
+    def position(self):
+        """The card's position after the last pick up, once it is known."""
+        if self.remaining != 1:
+            return None
+
+        return self.candidates.bit_length() - 1
+
+    def answer(self, pile_of_chosen_card):
+        """Narrows the candidates down with one pile answer.
+
+        Parameters
+        ----------
+        pile_of_chosen_card: The pile number (1 to columns) of the card.
+
+        Returns
+        -------
+        remaining: The number of positions the card can still be at.
+
+        Raises
+        ------
+        ValueError: If the pile number is not valid, or if no card could be
+                    in all of the piles chosen so far. The candidates are
+                    left as they were.
+        """
+        if not 1 <= pile_of_chosen_card <= self.layout.columns:
+            raise ValueError("Pile number has to be between 1 and " +
+                             str(self.layout.columns) + ".")
+
+        chosen = (self.candidates &
+                  column_masks(self.layout)[pile_of_chosen_card - 1])
+
+        if not chosen:
+            raise ValueError("No card is in all of the piles chosen so far.")
+
+        self.candidates = pick_up_candidates(self.layout, chosen)
+        self.rounds_played += 1
+
+        return self.remaining
+
+
+def run_early_reveal_session(layout, pile_choices, card_pile):
+    """Runs a scripted session, stopping as soon as the card is known.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    pile_choices: A sequence of pile numbers, one for each round played.
+    card_pile: A list of at least layout.number_of_cards cards.
+
+    Returns
+    -------
+    (card, rounds_played): The chosen card, or None if the answers ran out
+        before it was known, and the number of rounds dealt.
+
+    Raises
+    ------
+    ValueError: If no card could be in all of the chosen piles.
+    """
+    candidate_set = CandidateSet(layout)
+    card_pile = list(card_pile[0:layout.number_of_cards])
+
+    for pile_of_chosen_card in pile_choices:
+        if candidate_set.position is not None:
+            break
+
+        card_piles = deal_cards_into_columns(card_pile, layout.columns)
+        candidate_set.answer(pile_of_chosen_card)
+        card_pile = pick_up_columns(pile_of_chosen_card, card_piles)
+
+    if candidate_set.position is None:
+        return None, candidate_set.rounds_played
+
+    return card_pile[candidate_set.position], candidate_set.rounds_played
+
+
+def honest_pile_choices(layout, card_pile, chosen_card):
+    """Finds the pile choices of a player who always points to their card.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+    card_pile: A list of at least layout.number_of_cards cards.
+    chosen_card: The card the player chose.
+
+    Returns
+    -------
+    pile_choices: A list of pile numbers, one for each round.
+    """
+    card_pile = list(card_pile[0:layout.number_of_cards])
+    pile_choices = []
+
+    for _ in range(layout.rounds):
+        card_piles = deal_cards_into_columns(card_pile, layout.columns)
+        pile_of_chosen_card = card_pile.index(chosen_card) % layout.columns + 1
+        pile_choices.append(pile_of_chosen_card)
+        card_pile = pick_up_columns(pile_of_chosen_card, card_piles)
+
+    return pile_choices
+
+
+def simulate_final_indexes(layout):
+    """Deals every possible chosen card and records where it ends.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Returns
+    -------
+    final_indexes: A set of the indexes the chosen card ended at.
+    """
+    check_layout(layout)
+
+    card_pile = list(range(layout.number_of_cards))
+    final_indexes = set()
+
+    for chosen_card in card_pile:
+        pile_choices = honest_pile_choices(layout, card_pile, chosen_card)
+        final_pile = run_general_session(layout, pile_choices, card_pile)
+        final_indexes.add(final_pile.index(chosen_card))
+
+    return final_indexes
+
+
+def verify_layout(layout):
+    """Checks the predicted final index of a layout against simulation.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Returns
+    -------
+    final_index: The guaranteed final index, or None if there is none.
+
+    Raises
+    ------
+    AssertionError: If the prediction, the solved first positions or the
+                    early reveals and the simulation disagree.
+    """
+    final_index = predict_final_index(layout)
+    final_indexes = simulate_final_indexes(layout)
+
+    if final_index is None:
+        assert len(final_indexes) > 1, (
+            str(layout) + " always ends at " + str(final_indexes))
+    else:
+        assert final_indexes == {final_index}, (
+            str(layout) + " predicted " + str(final_index) + " but ended at " +
+            str(sorted(final_indexes)))
+
+        for initial_position in range(layout.number_of_cards):
+            pile_choices = honest_pile_choices(
+                layout, range(layout.number_of_cards), initial_position)
+            solved_position = solve_initial_position(layout, pile_choices)
+
+            assert solved_position == initial_position, (
+                str(layout) + " solved position " + str(initial_position) +
+                " as " + str(solved_position))
+
+    for chosen_card in range(layout.number_of_cards):
+        pile_choices = honest_pile_choices(
+            layout, range(layout.number_of_cards), chosen_card)
+        card, _ = run_early_reveal_session(layout, pile_choices,
+                                           range(layout.number_of_cards))
+
+        assert card in (chosen_card, None), (
+            str(layout) + " revealed " + str(card) + " early instead of " +
+            str(chosen_card))
+
+    return final_index
+
+
+def main(argv=None):
+    """Prints and verifies the final index of a layout."""
+    parser = argparse.ArgumentParser(
+        description="Predict and verify where the chosen card ends.")
+    parser.add_argument("--columns", type=int, default=TWENTY_ONE.columns)
+    parser.add_argument("--rows", type=int, default=TWENTY_ONE.rows)
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="rounds to deal, the fewest needed by default")
+    args = parser.parse_args(argv)
+
+    if args.rounds is None:
+        try:
+            layout = adaptive_layout(args.columns, args.rows)
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        layout = TrickLayout(args.columns, args.rows, args.rounds)
+
+    final_index = verify_layout(layout)
+
+    if final_index is None:
+        print(str(layout.number_of_cards) + " cards in " +
+              str(layout.columns) + " columns: no guaranteed index after " +
+              str(layout.rounds) + " rounds.")
+    else:
+        print(str(layout.number_of_cards) + " cards in " +
+              str(layout.columns) + " columns: card ends at index " +
+              str(final_index) + " after " + str(layout.rounds) + " rounds.")
+
+
+if __name__ == "__main__":
+    main()
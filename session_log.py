@@ -0,0 +1,298 @@
+"""Append-only binary event log of trick sessions, and fast replay.
+
+Every event is a fixed EVENT_HEADER (event type, session id, timestamp in
+nanoseconds and payload length) followed by a short payload:
+
+    DECK         the 21 dealt card numbers, see card_encoding
+    SEED         the root seed the deck was shuffled from, 8 bytes, see
+                 trick_random.session_rng
+    PILE_CHOICE  the pile number (1 to 3) of one turn
+    TWO_PILES    the two pile indexes given to remove_piles
+    ONE_PILE     the pile index given to remove_piles
+    ONE_CARD     0 if print_last_card_removal removed card 1, else 1
+
+The log is only ever appended to, and is read through mmap without copying.
+Replay feeds the events back through deal_cards_into_3_columns,
+pick_up_card_piles and remove_piles with no terminal output, to reproduce a
+session exactly or to use real traffic as a benchmark:
+
+    python trick_server.py --log sessions.log
+    python session_log.py sessions.log
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from contextlib import redirect_stdout
+
+from card_trick import (CARD_NAMES, make_deck, deal_cards_into_3_columns,
+                        pick_up_card_piles, remove_piles,
+                        ALL_FACE_DOWN_PILES, CARD_PILE_INDEX, PILE_SLICES,
+                        remove_piles_from_mask)
+from card_encoding import encode_cards
+from trick_random import session_rng
+from trick_session import CHOSEN_CARD_PILE, TWO_PILES, ONE_PILE, ONE_CARD
+
+
+DECK, SEED, PILE_CHOICE, TWO_PILES_CHOICE, ONE_PILE_CHOICE, \
+    ONE_CARD_CHOICE = range(1, 7)
+
+EVENT_HEADER = struct.Struct("<BIQB")
+SEED_FORMAT = struct.Struct("<q")
+
+# The event written for an answer accepted in each TrickSession state.
+STATE_EVENTS = {CHOSEN_CARD_PILE: PILE_CHOICE,
+                TWO_PILES: TWO_PILES_CHOICE,
+                ONE_PILE: ONE_PILE_CHOICE,
+                ONE_CARD: ONE_CARD_CHOICE}
+
+
+def encode_answer(event_type, value):
+    """Packs a validated answer into an event payload."""
+    if event_type == TWO_PILES_CHOICE:
+        return bytes(value)
+
+    if event_type == ONE_CARD_CHOICE:
+        # check_1_card accepts any number, e.g. "0" or "300", but
+        # print_last_card_removal only tells whether it is card 1.
+        value = 0 if value == 0 else 1
+
+    return struct.pack("<b", value)
+
+
+def decode_answer(event_type, payload):
+    """Unpacks an event payload back into the validated answer."""
+    if event_type == TWO_PILES_CHOICE:
+        return list(payload)
+
+    return struct.unpack("<b", payload)[0]
+
+
+def next_session_id(path):
+    """Finds the first session id a log has not used yet.
+
+    Parameters
+    ----------
+    path: The log file.
+
+    Returns
+    -------
+    session_id: One more than the largest session id in the log, or 0 when
+                the log is empty or does not exist.
+    """
+    try:
+        log_file = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+
+    with log_file:
+        if os.fstat(log_file.fileno()).st_size == 0:
+            return 0
+
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return max((session_id
+                        for _, session_id, _, _ in read_events(view)),
+                       default=-1) + 1
+
+
+class SessionLogWriter:
+    """Appends session events to a log file.
+
+    Parameters
+    ----------
+    path: The log file, created if it does not exist.
+    clock: The function giving timestamps, time.time_ns by default.
+
+    Attributes
+    ----------
+    next_session_id: The first session id not in the log when it was
+                     opened. A server appending to an old log numbers its
+                     sessions from here, so replay does not mix them up.
+    """
+
+    def __init__(self, path, clock=time.time_ns):
+        self.next_session_id = next_session_id(path)
+        self._file = open(path, "ab")
+        self._clock = clock
+
+    def write_event(self, event_type, session_id, payload=b""):
+        """Appends one event."""
+        self._file.write(EVENT_HEADER.pack(event_type, session_id,
+                                           self._clock(), len(payload)))
+        self._file.write(payload)
+
+    def log_deck(self, session_id, deck):
+        """Logs the 21 cards a session is dealt from a list of card names."""
+        self.write_event(DECK, session_id, encode_cards(deck[0:21]))
+
+    def log_seed(self, session_id, seed):
+        """Logs the root seed a session's deck was shuffled from."""
+        self.write_event(SEED, session_id, SEED_FORMAT.pack(seed))
+
+    def recorder(self, session_id):
+        """Makes a TrickSession recorder logging its answers."""
+        def record(state, value):
+            event_type = STATE_EVENTS[state]
+            self.write_event(event_type, session_id,
+                             encode_answer(event_type, value))
+
+        return record
+
+    def flush(self):
+        """Writes any buffered events to the file."""
+        self._file.flush()
+
+    def close(self):
+        """Flushes and closes the log."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def read_events(view):
+    """Reads the events of a log without copying it.
+
+    Parameters
+    ----------
+    view: A bytes like object of the whole log, e.g. an mmap.
+
+    Yields
+    ------
+    (event_type, session_id, timestamp, payload): For each event, payload
+        being a memoryview into the log.
+    """
+    view = memoryview(view)
+    offset = 0
+    end = len(view)
+
+    while offset + EVENT_HEADER.size <= end:
+        event_type, session_id, timestamp, length = \
+            EVENT_HEADER.unpack_from(view, offset)
+        offset += EVENT_HEADER.size
+
+        if offset + length > end:
+            # A partly written last event.
+            break
+
+        yield event_type, session_id, timestamp, view[offset:offset + length]
+        offset += length
+
+
+def deck_from_seed(seed, session_id):
+    """Makes the deck a SEED event stands for."""
+    return make_deck(session_rng(seed, session_id))
+
+
+class _ReplayedSession:
+    __slots__ = ("deck_fragment", "card_piles", "live_piles")
+
+    def __init__(self, deck):
+        self.deck_fragment = deck[0:21]
+        self.card_piles = None
+        self.live_piles = ALL_FACE_DOWN_PILES
+
+
+def replay(view):
+    """Replays every session in a log through the real game functions.
+
+    Parameters
+    ----------
+    view: A bytes like object of the whole log, e.g. an mmap.
+
+    Returns
+    -------
+    (sessions, mismatches): A dict of session id to the card revealed, or
+        None for sessions which did not finish, and a list of the ids of
+        sessions whose reveal was not deck_fragment[10].
+    """
+    sessions = {}
+    revealed = {}
+    mismatches = []
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for event_type, session_id, _, payload in read_events(view):
+            if event_type == DECK:
+                sessions[session_id] = _ReplayedSession(
+                    [CARD_NAMES[code] for code in payload])
+                revealed[session_id] = None
+                continue
+
+            if event_type == SEED:
+                seed = SEED_FORMAT.unpack(payload)[0]
+                sessions[session_id] = _ReplayedSession(
+                    deck_from_seed(seed, session_id))
+                revealed[session_id] = None
+                continue
+
+            session = sessions[session_id]
+            answer = decode_answer(event_type, payload)
+
+            if event_type == PILE_CHOICE:
+                card_piles = deal_cards_into_3_columns(session.deck_fragment)
+                session.deck_fragment = pick_up_card_piles(answer, card_piles)
+
+            elif event_type in (TWO_PILES_CHOICE, ONE_PILE_CHOICE):
+                if session.card_piles is None:
+                    session.card_piles = [session.deck_fragment[start:end]
+                                          for start, end in PILE_SLICES]
+                session.card_piles = remove_piles(answer, session.card_piles)
+                session.live_piles = remove_piles_from_mask(
+                    answer, session.live_piles)
+
+            elif event_type == ONE_CARD_CHOICE:
+                card = session.card_piles[CARD_PILE_INDEX][1]
+                revealed[session_id] = card
+                del sessions[session_id]
+
+                if card != session.deck_fragment[10]:
+                    mismatches.append(session_id)
+
+            else:
+                raise ValueError("Unknown event type " + str(event_type) +
+                                 ".")
+
+    return revealed, mismatches
+
+
+def replay_file(path):
+    """Memory maps a log file and replays it, see replay."""
+    with open(path, "rb") as log_file:
+        if os.fstat(log_file.fileno()).st_size == 0:
+            return {}, []
+
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return replay(view)
+
+
+def main(argv=None):
+    """Replays a log and prints the sessions, mismatches and throughput."""
+    parser = argparse.ArgumentParser(
+        description="Replay a session event log at full speed.")
+    parser.add_argument("log", help="the event log file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    revealed, mismatches = replay_file(args.log)
+    elapsed = time.perf_counter() - start
+
+    finished = sum(card is not None for card in revealed.values())
+
+    print(str(len(revealed)) + " sessions, " + str(finished) + " finished, " +
+          str(len(mismatches)) + " wrong reveals, " +
+          str(round(len(revealed) / max(elapsed, 1e-9))) +
+          " sessions/second")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""Round trip tests of session_log: sessions written, then replayed."""
+
+# pylint: disable=C0103
+
+import os
+import random
+import tempfile
+import unittest
+
+from card_trick import make_deck
+from session_log import (SessionLogWriter, replay_file, deck_from_seed,
+                         next_session_id)
+from trick_session import TrickSession
+
+
+# One answer for each prompt, ending with an out of range card number which
+# check_1_card still accepts.
+ANSWERS = ("1", "2", "3", "1 2", "3 4", "300")
+
+
+def play_logged_session(event_log, session_id, deck=None, seed=None,
+                        answers=ANSWERS):
+    """Plays one session into a log the way trick_server does."""
+    if seed is not None:
+        deck = deck_from_seed(seed, session_id)
+        event_log.log_seed(session_id, seed)
+    else:
+        event_log.log_deck(session_id, deck)
+
+    session = TrickSession(deck, event_log.recorder(session_id))
+    session.start()
+
+    for answer in answers:
+        session.answer(answer)
+
+    return session
+
+
+class SessionLogTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".log")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_any_accepted_card_number_replays(self):
+        for card_number in ("0", "1", "2", "300", "99999999999"):
+            deck = make_deck(random.Random(card_number))
+
+            with SessionLogWriter(self.path) as event_log:
+                session_id = event_log.next_session_id
+                session = play_logged_session(
+                    event_log, session_id, deck,
+                    answers=ANSWERS[:-1] + (card_number,))
+
+            self.assertTrue(session.finished)
+
+            revealed, mismatches = replay_file(self.path)
+            self.assertEqual(mismatches, [])
+            self.assertEqual(revealed[session_id],
+                             session.deck_fragment[10])
+
+    def test_sessions_continue_after_reopening(self):
+        with SessionLogWriter(self.path) as event_log:
+            self.assertEqual(event_log.next_session_id, 0)
+            play_logged_session(event_log, 0, seed=7)
+            play_logged_session(event_log, 1, make_deck(random.Random(1)))
+
+        with SessionLogWriter(self.path) as event_log:
+            self.assertEqual(event_log.next_session_id, 2)
+            play_logged_session(event_log, 2, seed=7)
+
+        self.assertEqual(next_session_id(self.path), 3)
+
+        revealed, mismatches = replay_file(self.path)
+        self.assertEqual(mismatches, [])
+        self.assertEqual(sorted(revealed), [0, 1, 2])
+        self.assertNotIn(None, revealed.values())
+
+    def test_missing_log_starts_at_zero(self):
+        os.remove(self.path)
+        self.assertEqual(next_session_id(self.path), 0)
+        open(self.path, "wb").close()
+
+
+if __name__ == "__main__":
+    unittest.main()
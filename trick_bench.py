@@ -0,0 +1,226 @@
+"""Benchmarks for every stage of the 'Twenty One' card trick.
+
+Each benchmark is timed with timeit after a warmup, repeated several times,
+and summarised as the min, median, mean and standard deviation of the time
+per call. Results can be saved as a JSON baseline and later runs compared
+against it, flagging any benchmark whose median got slower than allowed:
+
+    python trick_bench.py --save bench_baseline.json
+    python trick_bench.py --compare bench_baseline.json --tolerance 0.2
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+from contextlib import redirect_stdout
+
+from card_trick import (make_deck, deal_cards_into_3_columns,
+                        pick_up_card_piles, remove_piles,
+                        number_of_piles_remaining)
+from trick_engine import run_session, run_planned_session
+from trick_session import TrickSession
+
+
+DEFAULT_REPEAT = 7
+DEFAULT_TOLERANCE = 0.2
+
+# Answers for a whole scripted game, ending in the extra credit.
+SESSION_ANSWERS = ("1", "2", "3", "1 2", "3 4", "5")
+
+
+def _make_benchmarks(seed=0):
+    """Makes the functions to time, each working on fixed inputs.
+
+    Returns
+    -------
+    benchmarks: A dict of benchmark name to a function taking no arguments.
+    """
+    deck = make_deck(random.Random(seed))
+    deck_fragment = deck[0:21]
+    card_piles = deal_cards_into_3_columns(deck_fragment)
+    face_down_piles = [deck_fragment[0:3], deck_fragment[3:5], [""],
+                       deck_fragment[7:9], deck_fragment[9:11]]
+
+    def bench_remove_piles():
+        # remove_piles changes the piles it is given, so each call gets a
+        # new list of them.
+        remove_piles([0, 1], list(face_down_piles))
+
+    def bench_scripted_game():
+        session = TrickSession(deck)
+        session.start()
+        for answer in SESSION_ANSWERS:
+            session.answer(answer)
+
+    return {
+        "make_deck": make_deck,
+        "deal_cards_into_3_columns":
+            lambda: deal_cards_into_3_columns(deck_fragment),
+        "pick_up_card_piles": lambda: pick_up_card_piles(2, card_piles),
+        "remove_piles": bench_remove_piles,
+        "number_of_piles_remaining":
+            lambda: number_of_piles_remaining(face_down_piles),
+        "session_replay": lambda: run_session((1, 2, 3), deck),
+        "session_planned": lambda: run_planned_session((1, 2, 3), deck),
+        "session_scripted_game": bench_scripted_game,
+    }
+
+
+BENCHMARK_NAMES = ("make_deck", "deal_cards_into_3_columns",
+                   "pick_up_card_piles", "remove_piles",
+                   "number_of_piles_remaining", "session_replay",
+                   "session_planned", "session_scripted_game")
+
+
+def time_benchmark(function, repeat=DEFAULT_REPEAT, min_time=0.2):
+    """Times a function and summarises the time per call.
+
+    Parameters
+    ----------
+    function: The function to time, taking no arguments.
+    repeat: The number of timed runs.
+    min_time: The least time in seconds each run should take, used to pick
+              the number of calls per run.
+
+    Returns
+    -------
+    stats: A dict with the calls per run and the min, median, mean and
+           standard deviation of the seconds per call.
+    """
+    timer = timeit.Timer(function)
+
+    # Some stages print, e.g. remove_piles. Their output is thrown away once
+    # for the whole run, so the redirect is not timed with every call.
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        # Warmup, and find how many calls make a run long enough to time
+        # well.
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+
+        per_call = [elapsed / number
+                    for elapsed in timer.repeat(repeat, number)]
+
+    return {"number": number,
+            "min": min(per_call),
+            "median": statistics.median(per_call),
+            "mean": statistics.mean(per_call),
+            "stdev": statistics.stdev(per_call) if repeat > 1 else 0.0}
+
+
+def run_benchmarks(names=None, repeat=DEFAULT_REPEAT, seed=0):
+    """Runs the benchmarks.
+
+    Parameters
+    ----------
+    names: Optional list of benchmark names to run, all by default.
+    repeat: The number of timed runs of each benchmark.
+    seed: The seed for the deck the benchmarks use.
+
+    Returns
+    -------
+    results: A dict with the environment and the stats of each benchmark.
+    """
+    benchmarks = _make_benchmarks(seed)
+
+    if names is None:
+        names = BENCHMARK_NAMES
+
+    return {"python": platform.python_version(),
+            "machine": platform.machine(),
+            "benchmarks": {name: time_benchmark(benchmarks[name], repeat)
+                           for name in names}}
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Finds the benchmarks which got slower than a baseline allows.
+
+    Parameters
+    ----------
+    results: Results from run_benchmarks.
+    baseline: Earlier results, e.g. loaded from a saved baseline.
+    tolerance: How much slower the median may be, 0.2 being 20%.
+
+    Returns
+    -------
+    regressions: A list of (name, baseline_median, median) for each
+                 benchmark slower than the tolerance.
+    """
+    regressions = []
+
+    for name, stats in results["benchmarks"].items():
+        baseline_stats = baseline["benchmarks"].get(name)
+
+        if baseline_stats is None:
+            continue
+
+        if stats["median"] > baseline_stats["median"] * (1 + tolerance):
+            regressions.append((name, baseline_stats["median"],
+                                stats["median"]))
+
+    return regressions
+
+
+def format_results(results):
+    """Formats results as a table of microseconds per call."""
+    lines = [name.ljust(28) + "median " +
+             format(stats["median"] * 1e6, "10.3f") + " us  min " +
+             format(stats["min"] * 1e6, "10.3f") + " us  stdev " +
+             format(stats["stdev"] * 1e6, "8.3f") + " us"
+             for name, stats in results["benchmarks"].items()]
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Runs the benchmarks and saves or compares a baseline."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark each stage of the Twenty One trick.")
+    parser.add_argument("names", nargs="*",
+                        help="benchmarks to run, all by default: " +
+                        ", ".join(BENCHMARK_NAMES))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--save", metavar="FILE",
+                        help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results to a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown of the median, 0.2 for 20%%")
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARK_NAMES:
+            parser.error("unknown benchmark " + name)
+
+    results = run_benchmarks(args.names or None, args.repeat)
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare_results(results, baseline, args.tolerance)
+
+        for name, baseline_median, median in regressions:
+            print("SLOWER: " + name + " " +
+                  format(baseline_median * 1e6, ".3f") + " us -> " +
+                  format(median * 1e6, ".3f") + " us", file=sys.stderr)
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
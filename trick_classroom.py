@@ -0,0 +1,267 @@
+"""Classroom mode: one deal of the trick for many participants at once.
+
+Everyone watching the same 21 cards can play along, each with their own
+card. The cards are dealt and shown once per round for everyone, and each
+participant only answers which pile their card is in.
+
+The dealer can not put everyone's pile in the middle, so the piles are
+always picked up in the order they were dealt. A card at position p then
+moves to (p % columns) * rows + p // columns, which for the 21 card trick
+still gives every card its own three answers. The answers to card table,
+made once per layout, turns a participant's answers back into their card,
+so each participant costs one byte per round and a dict lookup:
+
+    python trick_classroom.py 100000 --seed 1
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import time
+from functools import lru_cache
+
+from card_trick import make_deck, print_card_pile, check_chosen_card_pile
+from general_trick import (TWENTY_ONE, check_layout, deal_cards_into_columns,
+                           pick_up_columns)
+from trick_random import SeedSequence
+from trick_render import render_frames
+
+
+def next_shared_position(layout, position):
+    """Finds where a card moves to when the piles keep their dealt order."""
+    return ((position % layout.columns) * layout.rows +
+            position // layout.columns)
+
+
+@lru_cache(maxsize=None)
+def answer_table(layout):
+    """Maps every participant's possible answers to the card they chose.
+
+    Parameters
+    ----------
+    layout: A TrickLayout.
+
+    Returns
+    -------
+    table: A dict of the answers, a bytes of one pile number for each
+           round, to the position of the card in the first deal.
+
+    Raises
+    ------
+    ValueError: If two cards get the same answers, so the layout has too
+                few rounds for a classroom.
+    """
+    check_layout(layout)
+    table = {}
+
+    for initial_position in range(layout.number_of_cards):
+        position = initial_position
+        answers = bytearray()
+
+        for _ in range(layout.rounds):
+            answers.append(position % layout.columns + 1)
+            position = next_shared_position(layout, position)
+
+        answers = bytes(answers)
+
+        if answers in table:
+            raise ValueError(str(layout) + " can not tell every card apart "
+                             "when the piles keep their order.")
+
+        table[answers] = initial_position
+
+    return table
+
+
+class Classroom:
+    """One shared deal of the trick and every participant's answers.
+
+    Parameters
+    ----------
+    number_of_participants: The number of people playing along.
+    deck: Optional list of at least layout.number_of_cards cards. A new deck
+          is made when this is not given.
+    layout: The TrickLayout to deal, TWENTY_ONE by default.
+    """
+
+    __slots__ = ("layout", "first_deal", "card_pile", "round", "answers",
+                 "_card_piles", "_deal_text")
+
+    def __init__(self, number_of_participants, deck=None, layout=TWENTY_ONE):
+        answer_table(layout)
+
+        if deck is None:
+            deck = make_deck()
+
+        if len(deck) < layout.number_of_cards:
+            raise ValueError("Expected a deck of at least " +
+                             str(layout.number_of_cards) + " cards.")
+
+        self.layout = layout
+        self.first_deal = list(deck[0:layout.number_of_cards])
+        self.card_pile = self.first_deal
+        self.round = 0
+        self.answers = bytearray(number_of_participants * layout.rounds)
+        self._card_piles = None
+        self._deal_text = None
+
+    @property
+    def number_of_participants(self):
+        """The number of people playing along."""
+        return len(self.answers) // self.layout.rounds
+
+    @property
+    def finished(self):
+        """True once every round has been dealt and answered."""
+        return self.round == self.layout.rounds
+
+    def deal(self):
+        """Returns the text of this round's deal, the same for everyone.
+
+        It is rendered the first time it is asked for in a round.
+        """
+        if self.finished:
+            raise ValueError("Every round has been dealt.")
+
+        if self._deal_text is None:
+            card_piles = self._deal_piles()
+            frames = []
+
+            with render_frames(frames.append):
+                print()
+                for pile_number, card_pile in enumerate(card_piles, 1):
+                    print_card_pile(pile_number, card_pile)
+                print()
+
+            self._deal_text = "".join(frames)
+
+        return self._deal_text
+
+    def answer(self, participant, text):
+        """Takes one participant's answer for this round.
+
+        Parameters
+        ----------
+        participant: The number of the participant, from 0.
+        text: The line they entered, without the newline.
+
+        Returns
+        -------
+        message: Why the answer is not valid, or "" if it was taken. A later
+                 answer in the same round replaces it.
+        """
+        if self.finished:
+            raise ValueError("Every round has been answered.")
+
+        frames = []
+
+        with render_frames(frames.append):
+            chosen_card_pile = check_chosen_card_pile(text,
+                                                      self.layout.columns)
+
+        if chosen_card_pile is None:
+            return "".join(frames)
+
+        self.answers[participant * self.layout.rounds + self.round] = \
+            chosen_card_pile
+
+        return ""
+
+    def next_round(self):
+        """Picks up the piles in their dealt order, ready for the next deal.
+
+        Participants who did not answer this round can not be revealed.
+        """
+        if self.finished:
+            raise ValueError("Every round has been dealt.")
+
+        # The middle pile staying in the middle keeps every pile in place.
+        self.card_pile = pick_up_columns(self.layout.middle_pile + 1,
+                                         self._deal_piles())
+        self.round += 1
+        self._card_piles = None
+        self._deal_text = None
+
+    def _deal_piles(self):
+        """Deals this round's piles, once however often they are needed."""
+        if self._card_piles is None:
+            self._card_piles = deal_cards_into_columns(self.card_pile,
+                                                       self.layout.columns)
+
+        return self._card_piles
+
+    def reveal(self, participant):
+        """Finds a participant's card from their answers.
+
+        Returns
+        -------
+        card: The card they chose, or None if they missed a round.
+        """
+        start = participant * self.layout.rounds
+        position = answer_table(self.layout).get(
+            bytes(self.answers[start:start + self.layout.rounds]))
+
+        if position is None:
+            return None
+
+        return self.first_deal[position]
+
+
+def simulate_classroom(number_of_participants, seed=None, layout=TWENTY_ONE):
+    """Plays a classroom where every participant answers honestly.
+
+    Parameters
+    ----------
+    number_of_participants: The number of participants.
+    seed: Optional root seed for the deck and the participants' cards.
+    layout: The TrickLayout to deal.
+
+    Returns
+    -------
+    wrong_reveals: The number of participants shown another card.
+    """
+    root = SeedSequence(seed)
+    classroom = Classroom(number_of_participants,
+                          make_deck(root.child(0).random()), layout)
+    rng = root.child(1).random()
+    chosen_cards = [rng.choice(classroom.first_deal)
+                    for _ in range(number_of_participants)]
+
+    while not classroom.finished:
+        classroom.deal()
+        positions = {card: position
+                     for position, card in enumerate(classroom.card_pile)}
+
+        for participant, card in enumerate(chosen_cards):
+            classroom.answer(participant,
+                             str(positions[card] % layout.columns + 1))
+
+        classroom.next_round()
+
+    return sum(classroom.reveal(participant) != card
+               for participant, card in enumerate(chosen_cards))
+
+
+def main(argv=None):
+    """Plays a classroom of simulated participants and checks the reveals."""
+    parser = argparse.ArgumentParser(
+        description="Play the Twenty One trick with a whole classroom.")
+    parser.add_argument("participants", type=int, nargs="?", default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    wrong_reveals = simulate_classroom(args.participants, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(str(args.participants) + " participants, " + str(wrong_reveals) +
+          " wrong reveals, " + str(TWENTY_ONE.rounds) +
+          " bytes each, " +
+          str(round(args.participants / max(elapsed, 1e-9))) +
+          " participants/second")
+
+    return 1 if wrong_reveals else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+"""Headless engine for the 'Twenty One' card trick.
+
+The engine runs make_deck, deal_cards_into_3_columns and pick_up_card_piles
+from card_trick with pre-scripted pile choices instead of asking the player,
+so whole batches of sessions can be run for regression checks and capacity
+planning.
+
+Every round of the trick is a fixed permutation of the 21 positions, picked
+by the number of the pile holding the card. The planned functions compose
+the three rounds into one gather index, so a session costs a single indexed
+pass over the deck instead of nine list builds.
+
+Run this module directly to time a batch of random sessions:
+
+    python trick_engine.py 100000 --seed 1 --engine planned
+
+or, to time the same decks on every run, with a deck_corpus file:
+
+    python trick_engine.py 100000 --corpus decks.bin
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import random
+import time
+from functools import lru_cache
+from operator import itemgetter
+
+from card_trick import (make_deck, deal_cards_into_3_columns,
+                        pick_up_card_piles)
+from trick_random import SeedSequence
+
+
+NUMBER_OF_CARDS = 21
+NUMBER_OF_ROUNDS = 3
+
+
+def check_pile_choices(pile_choices):
+    """Checks that a script of pile choices is valid for one session.
+
+    Parameters
+    ----------
+    pile_choices: A sequence of pile numbers, one for each round.
+
+    Raises
+    ------
+    ValueError: If there is not one choice per round or a choice is not
+                between 1 and 3.
+    """
+    if len(pile_choices) != NUMBER_OF_ROUNDS:
+        raise ValueError("Expected " + str(NUMBER_OF_ROUNDS) +
+                         " pile choices, got " + str(len(pile_choices)) + ".")
+
+    for chosen_card_pile in pile_choices:
+        if not 1 <= chosen_card_pile <= 3:
+            raise ValueError("Pile number has to be between 1 and 3.")
+
+
+def run_session(pile_choices, deck=None, seed=None):
+    """Runs one session of the trick with scripted pile choices.
+
+    Parameters
+    ----------
+    pile_choices: A sequence of 3 pile numbers (1 to 3), one for each round.
+    deck: Optional list of at least 21 cards. A new deck is made when this is
+          not given.
+    seed: Optional seed of the session's own random stream, used to shuffle
+          the new deck when no deck is given.
+
+    Returns
+    -------
+    deck_fragment: A list of the 21 cards after the last pick up. The card
+                   in the chosen piles is at index 10.
+    """
+    check_pile_choices(pile_choices)
+
+    if deck is None:
+        deck = make_deck(None if seed is None else SeedSequence(seed).random())
+
+    deck_fragment = deck[0:NUMBER_OF_CARDS]
+
+    for pile_of_chosen_card in pile_choices:
+        deck_fragment = deal_cards_into_3_columns(deck_fragment)
+        deck_fragment = pick_up_card_piles(pile_of_chosen_card, deck_fragment)
+
+    return deck_fragment
+
+
+def run_batch(choice_batch, decks=None, seed=None):
+    """Runs a batch of sessions, one for each script of pile choices.
+
+    Parameters
+    ----------
+    choice_batch: A sequence of pile choice scripts, see run_session.
+    decks: Optional sequence of decks, one for each script. New decks are
+           made with make_decks when this is not given.
+    seed: Optional root seed for the new decks, see make_decks.
+
+    Returns
+    -------
+    final_piles: A list with the final 21 card pile of each session.
+    """
+    if decks is None:
+        decks = make_decks(len(choice_batch), seed)
+
+    elif len(decks) != len(choice_batch):
+        raise ValueError("Expected one deck for each script of pile choices.")
+
+    return [run_session(pile_choices, deck)
+            for pile_choices, deck in zip(choice_batch, decks)]
+
+
+def make_decks(number_of_decks, seed=None):
+    """Makes a new deck for each session of a batch.
+
+    Parameters
+    ----------
+    number_of_decks: The number of decks to make.
+    seed: Optional root seed. Deck i is then shuffled with child i of
+          SeedSequence(seed), so each deck is the same on every run whatever
+          else uses the random module. The global generator is used when
+          this is not given.
+
+    Returns
+    -------
+    decks: A list of decks from make_deck.
+    """
+    if seed is None:
+        return [make_deck() for _ in range(number_of_decks)]
+
+    root = SeedSequence(seed)
+
+    return [make_deck(root.child(index).random())
+            for index in range(number_of_decks)]
+
+
+def round_permutation(chosen_card_pile):
+    """Finds where each card comes from in one deal and pick up round.
+
+    The round is run once on the positions 0 to 20 with the real deal and
+    pick up functions, so the permutation always matches them.
+
+    Parameters
+    ----------
+    chosen_card_pile: The pile number (1 to 3) which contains the card.
+
+    Returns
+    -------
+    permutation: A tuple where permutation[i] is the position, before the
+                 round, of the card at position i after the round.
+    """
+    positions = list(range(NUMBER_OF_CARDS))
+    card_piles = deal_cards_into_3_columns(positions)
+
+    return tuple(pick_up_card_piles(chosen_card_pile, card_piles))
+
+
+ROUND_PERMUTATIONS = {chosen_card_pile: round_permutation(chosen_card_pile)
+                      for chosen_card_pile in (1, 2, 3)}
+
+
+@lru_cache(maxsize=None)
+def _compile_plan(pile_choices):
+    plan = tuple(range(NUMBER_OF_CARDS))
+
+    for chosen_card_pile in pile_choices:
+        permutation = ROUND_PERMUTATIONS[chosen_card_pile]
+        plan = tuple(plan[position] for position in permutation)
+
+    return plan, itemgetter(*plan)
+
+
+def compile_plan(pile_choices):
+    """Composes the rounds of a session into a single gather index.
+
+    Plans are cached, so each of the 27 scripts is only composed once.
+
+    Parameters
+    ----------
+    pile_choices: A sequence of 3 pile numbers (1 to 3), one for each round.
+
+    Returns
+    -------
+    plan: A tuple where plan[i] is the position in the starting 21 cards of
+          the card that ends at position i.
+    """
+    pile_choices = tuple(pile_choices)
+    check_pile_choices(pile_choices)
+
+    return _compile_plan(pile_choices)[0]
+
+
+def run_planned_session(pile_choices, deck=None, seed=None):
+    """Runs one session like run_session, in one pass using its plan.
+
+    Parameters
+    ----------
+    pile_choices: A sequence of 3 pile numbers (1 to 3), one for each round.
+    deck: Optional list of at least 21 cards. A new deck is made when this is
+          not given.
+    seed: Optional seed of the session's own random stream, used to shuffle
+          the new deck when no deck is given.
+
+    Returns
+    -------
+    deck_fragment: A list of the 21 cards after the last pick up.
+    """
+    pile_choices = tuple(pile_choices)
+    check_pile_choices(pile_choices)
+
+    if deck is None:
+        deck = make_deck(None if seed is None else SeedSequence(seed).random())
+
+    return list(_compile_plan(pile_choices)[1](deck))
+
+
+def run_planned_batch(choice_batch, decks=None, seed=None):
+    """Runs a batch of sessions like run_batch, using compiled plans.
+
+    Parameters
+    ----------
+    choice_batch: A sequence of pile choice scripts, see run_session.
+    decks: Optional sequence of decks, one for each script. New decks are
+           made with make_decks when this is not given.
+    seed: Optional root seed for the new decks, see make_decks.
+
+    Returns
+    -------
+    final_piles: A list with the final 21 card pile of each session.
+    """
+    if decks is None:
+        decks = make_decks(len(choice_batch), seed)
+
+    elif len(decks) != len(choice_batch):
+        raise ValueError("Expected one deck for each script of pile choices.")
+
+    gathers = {}
+    final_piles = []
+
+    for pile_choices, deck in zip(choice_batch, decks):
+        pile_choices = tuple(pile_choices)
+        gather = gathers.get(pile_choices)
+
+        if gather is None:
+            compile_plan(pile_choices)
+            gather = gathers[pile_choices] = _compile_plan(pile_choices)[1]
+
+        final_piles.append(list(gather(deck)))
+
+    return final_piles
+
+
+ENGINES = {"replay": run_batch, "planned": run_planned_batch}
+
+
+def random_choice_batch(number_of_sessions, seed=None):
+    """Makes random pile choice scripts, e.g. for load and regression runs.
+
+    Parameters
+    ----------
+    number_of_sessions: The number of scripts to make.
+    seed: Optional seed so the same scripts can be made again.
+
+    Returns
+    -------
+    choice_batch: A list of tuples of 3 pile numbers.
+    """
+    rng = random.Random(seed)
+
+    return [tuple(rng.randint(1, 3) for _ in range(NUMBER_OF_ROUNDS))
+            for _ in range(number_of_sessions)]
+
+
+def time_batch(choice_batch, decks=None, seed=None, runner=run_batch):
+    """Runs a batch of sessions and measures how many run each second.
+
+    Parameters
+    ----------
+    choice_batch: A sequence of pile choice scripts, see run_session.
+    decks: Optional sequence of decks, one for each script. New decks are
+           made before timing starts when this is not given.
+    seed: Optional root seed for the new decks, see make_decks.
+    runner: The batch function to time, run_batch by default.
+
+    Returns
+    -------
+    (final_piles, sessions_per_second): The results of the batch and its
+                                        throughput.
+    """
+    # Shuffling costs more than running a session, so the decks are made
+    # before the clock starts.
+    if decks is None:
+        decks = make_decks(len(choice_batch), seed)
+
+    start = time.perf_counter()
+    final_piles = runner(choice_batch, decks, seed)
+    elapsed = time.perf_counter() - start
+
+    if elapsed > 0:
+        sessions_per_second = len(choice_batch) / elapsed
+    else:
+        sessions_per_second = float("inf")
+
+    return final_piles, sessions_per_second
+
+
+def main(argv=None):
+    """Times a batch of random sessions and prints the throughput."""
+    parser = argparse.ArgumentParser(
+        description="Run the Twenty One trick headless and report "
+                    "sessions/second.")
+    parser.add_argument("sessions", type=int, nargs="?", default=100000,
+                        help="number of sessions to run")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the decks and pile choices")
+    parser.add_argument("--engine", choices=sorted(ENGINES),
+                        default="replay",
+                        help="replay the rounds or use compiled plans")
+    parser.add_argument("--corpus", metavar="FILE",
+                        help="deal the decks from a deck_corpus file")
+    args = parser.parse_args(argv)
+
+    choice_batch = random_choice_batch(args.sessions, args.seed)
+
+    if args.corpus:
+        from deck_corpus import DeckCorpus
+
+        with DeckCorpus(args.corpus) as corpus:
+            decks = corpus.decks(args.sessions)
+            _, sessions_per_second = time_batch(choice_batch, decks,
+                                                runner=ENGINES[args.engine])
+            decks = None
+    else:
+        _, sessions_per_second = time_batch(choice_batch, seed=args.seed,
+                                            runner=ENGINES[args.engine])
+
+    print(str(args.sessions) + " sessions (" + args.engine + "), " +
+          str(round(sessions_per_second)) + " sessions/second")
+
+
+if __name__ == "__main__":
+    main()
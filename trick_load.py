@@ -0,0 +1,453 @@
+"""Open loop load generator with simulated players of the trick.
+
+Players arrive on a Poisson schedule at a fixed rate whatever state the
+game is in, so a slow game builds up a queue instead of slowing the players
+down. Each SimulatedPlayer picks a card from the first deal, answers every
+pile prompt correctly from the piles it is shown, and can be set to give
+wrong answers to TWO_PILES_PROMPT at a given rate to trip check_2_piles.
+
+Each turn's latency is measured from when the player meant to send its
+answer, its arrival time or the end of its last turn plus its think time,
+not from when it got to send it. Time lost to a backed up event loop or
+server is then counted instead of hidden (no coordinated omission).
+
+The players can drive TrickSessions in this process, or a server, either
+one already running or a trick_server started for the run:
+
+    python trick_load.py --rate 2000 --players 20000 --target engine
+    python trick_load.py --rate 500 --players 5000 --target server
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from card_trick import (make_deck, remove_piles_from_mask,
+                        ALL_FACE_DOWN_PILES, CHOSEN_CARD_PILE_PROMPT,
+                        TWO_PILES_PROMPT, ONE_PILE_PROMPT, ONE_CARD_PROMPT)
+from trick_random import SeedSequence
+from trick_server import DEFAULT_HOST, PROMPT_LINES, read_until_prompt
+from trick_session import TrickSession
+from trick_timing import LatencyHistogram
+
+
+TARGETS = ("engine", "server")
+
+# Answers to TWO_PILES_PROMPT which check_2_piles always rejects, for
+# players making mistakes. Answers naming removed piles are added per turn.
+BAD_TWO_PILE_ANSWERS = ("6 7", "0 1", "12", "1,2", "one two", "")
+
+REVEAL_PREFIX = "Your card is "
+
+# Seconds to wait for a started server to accept connections.
+SERVER_START_TIMEOUT = 10
+
+# Seconds a player waits for the server to connect or send a turn before
+# the session counts as failed.
+READ_TIMEOUT = 30
+
+# Each player's task is made at most this many nanoseconds before its
+# arrival, so only the players due soon or still playing are in memory.
+TASK_LEAD_TIME = 1000000000
+
+
+class SimulatedPlayer:
+    """A player answering the trick's prompts from the text it is shown.
+
+    Parameters
+    ----------
+    rng: The player's own random.Random.
+    error_rate: The chance, from 0 to 1, of a wrong answer to each
+                TWO_PILES_PROMPT.
+    """
+
+    __slots__ = ("rng", "error_rate", "card", "live_piles", "mistakes",
+                 "revealed")
+
+    def __init__(self, rng, error_rate=0.0):
+        self.rng = rng
+        self.error_rate = error_rate
+        self.card = None
+        self.live_piles = ALL_FACE_DOWN_PILES
+        self.mistakes = 0
+        self.revealed = None
+
+    @property
+    def fooled(self):
+        """True once the card revealed to the player is the one chosen."""
+        return self.revealed is not None and self.revealed == self.card
+
+    def answer(self, text, prompt):
+        """Finds the answer to a prompt.
+
+        Parameters
+        ----------
+        text: The text shown with the prompt.
+        prompt: The prompt, e.g. TWO_PILES_PROMPT.
+
+        Returns
+        -------
+        answer: The line to answer with.
+        """
+        if prompt == CHOSEN_CARD_PILE_PROMPT:
+            return self._answer_chosen_card_pile(text)
+
+        if prompt == TWO_PILES_PROMPT:
+            return self._answer_two_piles()
+
+        if prompt == ONE_PILE_PROMPT:
+            pile_index = self.rng.choice(self._live_pile_indexes())
+            self.live_piles = remove_piles_from_mask(pile_index,
+                                                     self.live_piles)
+            return str(pile_index + 1)
+
+        if prompt == ONE_CARD_PROMPT:
+            return self.rng.choice(("1", "2"))
+
+        raise ValueError("Unknown prompt " + repr(prompt) + ".")
+
+    def see_reveal(self, text):
+        """Reads the revealed card from the last text of a session."""
+        for line in text.splitlines():
+            if line.startswith(REVEAL_PREFIX):
+                self.revealed = line[len(REVEAL_PREFIX):]
+
+    def _answer_chosen_card_pile(self, text):
+        card_piles = [line.split(": ", 1)[1].split(", ")
+                      for line in text.splitlines()
+                      if line.startswith("Pile ")]
+
+        if self.card is None:
+            self.card = self.rng.choice(self.rng.choice(card_piles))
+
+        for pile_number, card_pile in enumerate(card_piles, 1):
+            if self.card in card_pile:
+                return str(pile_number)
+
+        raise ValueError("The chosen card " + self.card + " was not dealt.")
+
+    def _answer_two_piles(self):
+        live_pile_indexes = self._live_pile_indexes()
+
+        if self.rng.random() < self.error_rate:
+            self.mistakes += 1
+            removed = [str(index + 1) for index in range(5)
+                       if not (self.live_piles >> index) & 1]
+            bad_answers = BAD_TWO_PILE_ANSWERS + tuple(
+                removed_pile + " " + str(live_pile_indexes[0] + 1)
+                for removed_pile in removed)
+            return self.rng.choice(bad_answers)
+
+        chosen_piles = [self.rng.choice(live_pile_indexes),
+                        self.rng.choice(live_pile_indexes)]
+        self.live_piles = remove_piles_from_mask(chosen_piles,
+                                                 self.live_piles)
+
+        return str(chosen_piles[0] + 1) + " " + str(chosen_piles[1] + 1)
+
+    def _live_pile_indexes(self):
+        return [index for index in range(5) if (self.live_piles >> index) & 1]
+
+
+class LoadResult:
+    """What a load run measured.
+
+    Attributes
+    ----------
+    turns: A LatencyHistogram of each turn's latency in nanoseconds.
+    sessions: A LatencyHistogram of each whole session's time from its
+              scheduled arrival, in nanoseconds.
+    fooled: The number of players shown the card they chose.
+    not_fooled: The number of players shown another card.
+    failed: The number of sessions which did not finish.
+    mistakes: The number of wrong answers the players gave on purpose.
+    elapsed: The seconds from the start of the run to the end of the last
+             session.
+    """
+
+    def __init__(self):
+        self.turns = LatencyHistogram()
+        self.sessions = LatencyHistogram()
+        self.fooled = 0
+        self.not_fooled = 0
+        self.failed = 0
+        self.mistakes = 0
+        self.elapsed = 0.0
+
+    def add_player(self, player):
+        """Counts how a finished player's session went."""
+        self.mistakes += player.mistakes
+
+        if player.fooled:
+            self.fooled += 1
+        else:
+            self.not_fooled += 1
+
+
+async def _sleep_until(deadline):
+    # Always yields, so players answering with no think time take turns.
+    await asyncio.sleep(max(0, deadline - time.perf_counter_ns()) / 1e9)
+
+
+async def _play_engine(player, arrival, think_time, result):
+    """Plays one session on a TrickSession in this process."""
+    await _sleep_until(arrival)
+
+    session = TrickSession(make_deck(player.rng))
+    text = session.start()
+    done = time.perf_counter_ns()
+    result.turns.record(done - arrival)
+
+    while not session.finished:
+        intended = done + think_time
+        session.precompute()
+        await _sleep_until(intended)
+
+        text = session.answer(player.answer(text, session.prompt))
+        done = time.perf_counter_ns()
+        result.turns.record(done - intended)
+
+    player.see_reveal(text)
+    result.sessions.record(done - arrival)
+    result.add_player(player)
+
+
+def _split_prompt(text):
+    """Splits the prompt line off the end of a turn read from a server."""
+    head, _, last_line = text.rstrip("\n").rpartition("\n")
+
+    if last_line in PROMPT_LINES:
+        return head, last_line
+
+    return text, ""
+
+
+async def _play_server(player, arrival, think_time, result, host, port,
+                       read_timeout):
+    """Plays one session against a trick server."""
+    await _sleep_until(arrival)
+
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), read_timeout)
+    except (OSError, asyncio.TimeoutError):
+        result.failed += 1
+        return
+
+    try:
+        text, prompt = _split_prompt(await asyncio.wait_for(
+            read_until_prompt(reader), read_timeout))
+        done = time.perf_counter_ns()
+        result.turns.record(done - arrival)
+
+        while prompt:
+            intended = done + think_time
+            await _sleep_until(intended)
+
+            writer.write(player.answer(text, prompt).encode() + b"\n")
+            await writer.drain()
+            text, prompt = _split_prompt(await asyncio.wait_for(
+                read_until_prompt(reader), read_timeout))
+            done = time.perf_counter_ns()
+            result.turns.record(done - intended)
+
+        player.see_reveal(text)
+
+    except (ConnectionError, asyncio.TimeoutError):
+        # A stalled server fails the session instead of hanging the run.
+        result.failed += 1
+        return
+
+    finally:
+        writer.close()
+
+    if player.revealed is None:
+        result.failed += 1
+        return
+
+    result.sessions.record(done - arrival)
+    result.add_player(player)
+
+
+async def generate_load(number_of_players, rate, target="engine",
+                        error_rate=0.0, think_time=0.0, seed=None,
+                        host=DEFAULT_HOST, port=None,
+                        read_timeout=READ_TIMEOUT):
+    """Runs simulated players arriving on a Poisson schedule.
+
+    Parameters
+    ----------
+    number_of_players: The number of players to run.
+    rate: The mean number of players arriving per second.
+    target: "engine" to play TrickSessions in this process, or "server".
+    error_rate: The chance of a wrong answer to each TWO_PILES_PROMPT.
+    think_time: Seconds each player waits between seeing a prompt and
+                answering it.
+    seed: Optional root seed for the arrivals and every player's choices.
+    host: The address of the server.
+    port: The port of the server, needed when target is "server".
+    read_timeout: Seconds to wait for each turn from the server.
+
+    Returns
+    -------
+    result: A LoadResult.
+    """
+    if target not in TARGETS:
+        raise ValueError("Unknown target " + repr(target) + ".")
+
+    root = SeedSequence(seed)
+    arrivals_rng = root.child(0).random()
+    players_seed = root.child(1)
+    think_time = int(think_time * 1e9)
+    result = LoadResult()
+    # Finished tasks are dropped, keeping only the first error to raise.
+    tasks = set()
+    errors = []
+
+    def task_done(task):
+        tasks.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    start = time.perf_counter_ns()
+    arrival = start
+
+    for player_index in range(number_of_players):
+        arrival += int(arrivals_rng.expovariate(rate) * 1e9)
+
+        # The arrival times are fixed up front, so the schedule stays open
+        # loop however late each task gets to run. A task is only made
+        # TASK_LEAD_TIME ahead of its arrival, to bound the memory used.
+        if arrival - time.perf_counter_ns() > TASK_LEAD_TIME:
+            await _sleep_until(arrival - TASK_LEAD_TIME)
+
+        player = SimulatedPlayer(players_seed.child(player_index).random(),
+                                 error_rate)
+
+        if target == "engine":
+            play = _play_engine(player, arrival, think_time, result)
+        else:
+            play = _play_server(player, arrival, think_time, result, host,
+                                port, read_timeout)
+
+        task = asyncio.ensure_future(play)
+        tasks.add(task)
+        task.add_done_callback(task_done)
+
+    await asyncio.gather(*tasks)
+    result.elapsed = (time.perf_counter_ns() - start) / 1e9
+
+    if errors:
+        raise errors[0]
+
+    return result
+
+
+def _free_port(host):
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+def start_local_server(host=DEFAULT_HOST):
+    """Starts trick_server in a new process for a load run.
+
+    Returns
+    -------
+    (process, port): The server's subprocess.Popen and the port it listens
+                     on. The caller has to terminate the process.
+    """
+    port = _free_port(host)
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "trick_server.py")
+    process = subprocess.Popen([sys.executable, server_path, "--host", host,
+                                "--port", str(port)])
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("The trick server did not start.")
+            time.sleep(0.05)
+
+
+def format_result(result):
+    """Formats a LoadResult as a short report."""
+    def microseconds(histogram, percent):
+        value = histogram.percentile(percent)
+        return "-" if value is None else format(value / 1000, ".0f") + " us"
+
+    finished = result.fooled + result.not_fooled
+
+    return "\n".join((
+        str(finished) + " sessions, " + str(result.failed) + " failed, " +
+        str(result.not_fooled) + " wrong reveals, " +
+        str(result.mistakes) + " wrong answers given",
+        format(finished / max(result.elapsed, 1e-9), ".0f") +
+        " sessions/second, " +
+        format(result.turns.total_count / max(result.elapsed, 1e-9), ".0f") +
+        " turns/second",
+        "turn latency    p50 " + microseconds(result.turns, 50) +
+        "  p99 " + microseconds(result.turns, 99) +
+        "  p999 " + microseconds(result.turns, 99.9),
+        "session time    p50 " + microseconds(result.sessions, 50) +
+        "  p99 " + microseconds(result.sessions, 99) +
+        "  p999 " + microseconds(result.sessions, 99.9)))
+
+
+def main(argv=None):
+    """Runs a load test from the command line and prints the report."""
+    parser = argparse.ArgumentParser(
+        description="Put an open loop load on the Twenty One trick.")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="mean players arriving per second")
+    parser.add_argument("--target", choices=TARGETS, default="engine")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="chance of a wrong answer to each 2 pile prompt")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="seconds each player takes to answer")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=None,
+                        help="port of a running server, one is started for "
+                             "the run when not given")
+    parser.add_argument("--read-timeout", type=float, default=READ_TIMEOUT,
+                        help="seconds to wait for each turn from the server")
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+
+    if args.target == "server" and port is None:
+        process, port = start_local_server(args.host)
+
+    try:
+        result = asyncio.run(generate_load(args.players, args.rate,
+                                           args.target, args.error_rate,
+                                           args.think_time, args.seed,
+                                           args.host, port,
+                                           args.read_timeout))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(format_result(result))
+
+    return 1 if result.not_fooled or result.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
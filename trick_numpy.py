@@ -0,0 +1,212 @@
+"""Vectorized batch mode for the 'Twenty One' card trick.
+
+Many sessions are held as one (N, 21) array of card numbers with their pile
+choices as an (N, 3) array. The deal from deal_cards_into_3_columns becomes a
+reshape and transpose, and the sandwich pick up from pick_up_card_piles
+becomes a take_along_axis over the piles, so there is no loop over sessions.
+
+This module needs NumPy, which the interactive game does not. Run it directly
+to check that the chosen card always ends at index 10:
+
+    python trick_numpy.py 1000000 --seed 1
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import time
+
+import numpy as np
+
+from card_trick import pick_up_card_piles
+
+
+NUMBER_OF_CARDS = 21
+NUMBER_OF_COLUMNS = 3
+NUMBER_OF_ROUNDS = 3
+CARDS_IN_DECK = 52
+
+
+def _pick_up_orders():
+    """Finds the order the piles are picked up in for each pile choice.
+
+    Returns
+    -------
+    pick_up_orders: A (3, 3) array, row c - 1 holding the pile indexes in
+                    the order pick_up_card_piles stacks them for choice c.
+    """
+    pile_indexes = [[[0], [1], [2]] for _ in range(NUMBER_OF_COLUMNS)]
+
+    return np.array([pick_up_card_piles(chosen_card_pile, card_piles)
+                     for chosen_card_pile, card_piles
+                     in zip((1, 2, 3), pile_indexes)], dtype=np.intp)
+
+
+PICK_UP_ORDERS = _pick_up_orders()
+
+
+def deal_batch(card_batch):
+    """Deals every session row by row into 3 columns of 7 cards.
+
+    Parameters
+    ----------
+    card_batch: An (N, 21) array of cards.
+
+    Returns
+    -------
+    card_piles: An (N, 3, 7) array view, card_piles[n, c] being column c + 1
+                of session n, the same as deal_cards_into_3_columns.
+    """
+    rows = NUMBER_OF_CARDS // NUMBER_OF_COLUMNS
+
+    return card_batch.reshape(-1, rows, NUMBER_OF_COLUMNS).transpose(0, 2, 1)
+
+
+def pick_up_batch(chosen_card_piles, card_piles):
+    """Picks up every session with its chosen pile in the middle.
+
+    Parameters
+    ----------
+    chosen_card_piles: An (N,) array of pile numbers (1 to 3).
+    card_piles: An (N, 3, 7) array of dealt piles, see deal_batch.
+
+    Returns
+    -------
+    card_batch: An (N, 21) array of the picked up cards.
+    """
+    pick_up_order = PICK_UP_ORDERS[chosen_card_piles - 1][:, :, np.newaxis]
+    stacked_piles = np.take_along_axis(card_piles, pick_up_order, axis=1)
+
+    return stacked_piles.reshape(-1, NUMBER_OF_CARDS)
+
+
+def run_batch_trick(card_batch, choice_batch):
+    """Runs all three rounds of the trick for every session at once.
+
+    Parameters
+    ----------
+    card_batch: An (N, 21) integer array, the starting cards of each session.
+    choice_batch: An (N, 3) integer array of pile numbers (1 to 3), one
+                  column for each round.
+
+    Returns
+    -------
+    card_batch: An (N, 21) array of the cards after the last pick up.
+    """
+    card_batch = np.asarray(card_batch)
+    choice_batch = np.asarray(choice_batch)
+
+    if card_batch.ndim != 2 or card_batch.shape[1] != NUMBER_OF_CARDS:
+        raise ValueError("Expected an (N, 21) array of cards.")
+
+    if choice_batch.shape != (card_batch.shape[0], NUMBER_OF_ROUNDS):
+        raise ValueError("Expected an (N, 3) array of pile choices.")
+
+    if choice_batch.size and (choice_batch.min() < 1 or
+                              choice_batch.max() > NUMBER_OF_COLUMNS):
+        raise ValueError("Pile number has to be between 1 and 3.")
+
+    for round_index in range(NUMBER_OF_ROUNDS):
+        card_piles = deal_batch(card_batch)
+        card_batch = pick_up_batch(choice_batch[:, round_index], card_piles)
+
+    return card_batch
+
+
+def find_chosen_card_piles(chosen_cards, card_piles):
+    """Finds the number of the pile holding each session's card.
+
+    Parameters
+    ----------
+    chosen_cards: An (N,) array of the card each player is thinking of.
+    card_piles: An (N, 3, 7) array of dealt piles.
+
+    Returns
+    -------
+    chosen_card_piles: An (N,) array of pile numbers (1 to 3).
+    """
+    in_pile = (card_piles == chosen_cards[:, np.newaxis, np.newaxis]).any(2)
+
+    return in_pile.argmax(axis=1) + 1
+
+
+def random_sessions(number_of_sessions, seed=None):
+    """Makes shuffled sessions and the pile choices an honest player gives.
+
+    Parameters
+    ----------
+    number_of_sessions: The number of sessions to make.
+    seed: Optional seed so the same sessions can be made again.
+
+    Returns
+    -------
+    (card_batch, choice_batch, chosen_cards): The (N, 21) starting cards,
+        the (N, 3) pile choices and the (N,) card each player chose.
+    """
+    rng = np.random.default_rng(seed)
+    decks = np.tile(np.arange(CARDS_IN_DECK, dtype=np.uint8),
+                    (number_of_sessions, 1))
+    card_batch = rng.permuted(decks, axis=1)[:, :NUMBER_OF_CARDS]
+
+    chosen_positions = rng.integers(0, NUMBER_OF_CARDS, number_of_sessions)
+    chosen_cards = card_batch[np.arange(number_of_sessions), chosen_positions]
+
+    choice_batch = np.empty((number_of_sessions, NUMBER_OF_ROUNDS),
+                            dtype=np.intp)
+    cards = card_batch
+
+    for round_index in range(NUMBER_OF_ROUNDS):
+        card_piles = deal_batch(cards)
+        choices = find_chosen_card_piles(chosen_cards, card_piles)
+        choice_batch[:, round_index] = choices
+        cards = pick_up_batch(choices, card_piles)
+
+    return card_batch, choice_batch, chosen_cards
+
+
+def verify_invariant(card_batch, choice_batch, chosen_cards):
+    """Checks that every session's chosen card ends at index 10.
+
+    Parameters
+    ----------
+    card_batch: An (N, 21) array of starting cards.
+    choice_batch: An (N, 3) array of pile choices.
+    chosen_cards: An (N,) array of the card each player chose.
+
+    Returns
+    -------
+    failures: An array of the indexes of sessions where the card did not
+              end at index 10, empty when the trick always works.
+    """
+    final_cards = run_batch_trick(card_batch, choice_batch)
+
+    return np.flatnonzero(final_cards[:, NUMBER_OF_CARDS // 2] !=
+                          chosen_cards)
+
+
+def main(argv=None):
+    """Verifies the trick on a batch of random sessions."""
+    parser = argparse.ArgumentParser(
+        description="Verify the Twenty One trick on a vectorized batch.")
+    parser.add_argument("sessions", type=int, nargs="?", default=1000000,
+                        help="number of sessions to run")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the decks and chosen cards")
+    args = parser.parse_args(argv)
+
+    card_batch, choice_batch, chosen_cards = random_sessions(args.sessions,
+                                                             args.seed)
+
+    start = time.perf_counter()
+    failures = verify_invariant(card_batch, choice_batch, chosen_cards)
+    elapsed = time.perf_counter() - start
+
+    print(str(args.sessions) + " sessions, " + str(len(failures)) +
+          " failures, " + str(round(args.sessions / max(elapsed, 1e-9))) +
+          " sessions/second")
+
+    return 1 if len(failures) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Independent, seedable random streams for sessions of the trick.
+
+make_deck shuffles with the random module's one global generator unless it
+is given its own. Sessions sharing the global generator can not be
+reproduced from a seed once they run side by side, and threads running
+them all take turns on the same state.
+
+A SeedSequence works like numpy's: it hashes a root seed together with a
+spawn key, the path of child indexes leading to it, into the state of a
+new random.Random. Every session, or every worker process and then every
+session inside it, gets its own stream which is the same on every run and
+does not overlap the others, without any coordination between them:
+
+    root = SeedSequence(1)
+    deck = make_deck(root.child(session_index).random())
+"""
+
+# pylint: disable=C0103
+
+import hashlib
+import random
+import secrets
+
+
+# Bits of state hashed out of a seed and its spawn key.
+STATE_BYTES = 32
+
+
+class SeedSequence:
+    """A root seed and the spawn key of one stream derived from it.
+
+    Parameters
+    ----------
+    entropy: The root seed, an int. A random 128 bit one is used when this is
+             not given, and can be read back to reproduce the streams.
+    spawn_key: The tuple of child indexes from the root to this sequence.
+    """
+
+    __slots__ = ("entropy", "spawn_key", "children_spawned")
+
+    def __init__(self, entropy=None, spawn_key=()):
+        if entropy is None:
+            entropy = secrets.randbits(128)
+
+        self.entropy = entropy
+        self.spawn_key = tuple(spawn_key)
+        self.children_spawned = 0
+
+    def __repr__(self):
+        return ("SeedSequence(" + str(self.entropy) + ", " +
+                str(self.spawn_key) + ")")
+
+    def generate_state(self):
+        """Hashes the seed and spawn key into an int of STATE_BYTES bytes."""
+        key = ",".join(str(part) for part in (self.entropy,) + self.spawn_key)
+        digest = hashlib.blake2b(key.encode(), digest_size=STATE_BYTES,
+                                 person=b"21-trick").digest()
+
+        return int.from_bytes(digest, "little")
+
+    def child(self, index):
+        """Returns the child sequence with a given index.
+
+        Children can be made in any order, e.g. straight from a session
+        number, and the same index always gives the same stream.
+        """
+        return SeedSequence(self.entropy, self.spawn_key + (index,))
+
+    def spawn(self, number_of_children):
+        """Returns the next children, not overlapping any spawned before.
+
+        Parameters
+        ----------
+        number_of_children: The number of child sequences to make.
+
+        Returns
+        -------
+        children: A list of SeedSequences.
+        """
+        start = self.children_spawned
+        self.children_spawned += number_of_children
+
+        return [self.child(index)
+                for index in range(start, start + number_of_children)]
+
+    def random(self):
+        """Returns a new random.Random seeded from this sequence."""
+        return random.Random(self.generate_state())
+
+
+def session_rng(root_seed, session_index):
+    """Returns the random stream of one session under a root seed.
+
+    Parameters
+    ----------
+    root_seed: The root seed, an int or a SeedSequence.
+    session_index: The number of the session, e.g. its order in a batch.
+
+    Returns
+    -------
+    rng: A random.Random which is the same for the same arguments.
+    """
+    if not isinstance(root_seed, SeedSequence):
+        root_seed = SeedSequence(root_seed)
+
+    return root_seed.child(session_index).random()
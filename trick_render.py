@@ -0,0 +1,111 @@
+"""Buffered output for the 'Twenty One' card trick.
+
+The print functions in card_trick write one line at a time, which is one
+write, and often one flush, per line on a terminal, pipe or socket. Inside
+render_frames everything printed is kept in a FrameWriter instead, and only
+written to the sink when stdout is flushed. input() flushes stdout after
+writing its prompt, so each turn of the game, with its piles, messages and
+prompt, goes out in a single write.
+
+A sink is any function which takes the text of a whole frame, e.g.
+
+    with render_frames(stream_sink(sys.stdout)):
+        main()
+"""
+
+# pylint: disable=C0103
+
+import io
+import sys
+from contextlib import contextmanager, redirect_stdout
+
+
+class FrameWriter(io.TextIOBase):
+    """A text stream which holds what is written until it is flushed.
+
+    Parameters
+    ----------
+    sink: A function which is given the text of each frame.
+    """
+
+    def __init__(self, sink):
+        super().__init__()
+        self.sink = sink
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._parts.append(text)
+        return len(text)
+
+    def flush(self):
+        """Sends everything written since the last flush as one frame."""
+        if self._parts:
+            frame = "".join(self._parts)
+            self._parts.clear()
+            self.sink(frame)
+
+
+def stream_sink(stream):
+    """Makes a sink which writes each frame to a stream and flushes it.
+
+    Parameters
+    ----------
+    stream: A text stream, e.g. sys.stdout.
+
+    Returns
+    -------
+    sink: A function taking the text of a frame.
+    """
+    def sink(frame):
+        stream.write(frame)
+        stream.flush()
+
+    return sink
+
+
+def bytes_sink(write, encoding="utf-8"):
+    """Makes a sink which encodes each frame, e.g. for a socket.
+
+    Parameters
+    ----------
+    write: A function taking bytes, e.g. asyncio.StreamWriter.write.
+    encoding: The text encoding to use.
+
+    Returns
+    -------
+    sink: A function taking the text of a frame.
+    """
+    def sink(frame):
+        write(frame.encode(encoding))
+
+    return sink
+
+
+@contextmanager
+def render_frames(sink=None):
+    """Buffers everything printed inside the block into frames.
+
+    Parameters
+    ----------
+    sink: Optional function given the text of each frame. By default frames
+          are written to the current stdout.
+
+    Yields
+    ------
+    writer: The FrameWriter standing in for stdout. Whatever is left in it
+            is sent when the block ends.
+    """
+    if sink is None:
+        sink = stream_sink(sys.stdout)
+
+    writer = FrameWriter(sink)
+
+    try:
+        with redirect_stdout(writer):
+            yield writer
+    finally:
+        writer.flush()
+
@@ -0,0 +1,266 @@
+"""Non-interactive driver for many scripted sessions of the trick.
+
+The ask_player functions of card_trick read one input() line at a time. This
+driver instead reads a whole stream of answers at once, from a file or a
+pipe, and plays session after session from it: each session takes lines
+until its card is revealed and the next line starts the next session.
+Every line is checked with the same check_ functions as the game, so a
+rejected line is skipped exactly like a player's retry.
+
+Each finished session is written as one RECORD_FORMAT record:
+
+    session   the number of the session in the stream, from 0
+    choices   the 3 pile numbers answered
+    live      the bit mask of the face down piles left at the reveal
+    rejected  the number of lines the validators rejected
+    position  where the revealed card was in the 21 dealt cards
+    card      the number of the revealed card, see card_encoding, or
+              NO_CARD when no decks were given
+
+For example:
+
+    python trick_script.py answers.txt --seed 1 --output records.bin
+    some_generator | python trick_script.py - --corpus decks.bin
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import os
+import struct
+import sys
+import time
+from contextlib import redirect_stdout
+
+from card_trick import (make_deck, check_chosen_card_pile, check_2_piles,
+                        check_1_pile, check_1_card, remove_piles_from_mask,
+                        count_live_piles, ALL_FACE_DOWN_PILES,
+                        CARD_PILE_INDEX, CHOSEN_CARD_INDEX)
+from card_encoding import CARD_CODES
+from trick_engine import NUMBER_OF_ROUNDS, compile_plan
+from trick_random import SeedSequence
+
+
+RECORD_FORMAT = struct.Struct("<I3sBIBB")
+RECORD_SIZE = RECORD_FORMAT.size
+
+# Written as the card when the driver has no decks, or as the position and
+# card when the pile with the card was removed.
+NO_CARD = 0xFF
+
+
+class ScriptResult:
+    """What a stream of scripted answers played.
+
+    Attributes
+    ----------
+    records: A bytearray of one RECORD_FORMAT record per finished session.
+    sessions: The number of finished sessions.
+    rejected: The number of lines the validators rejected.
+    unfinished: True if the stream ended part way through a session.
+    """
+
+    __slots__ = ("records", "sessions", "rejected", "unfinished")
+
+    def __init__(self):
+        self.records = bytearray()
+        self.sessions = 0
+        self.rejected = 0
+        self.unfinished = False
+
+
+def play_script(lines, decks=None):
+    """Plays consecutive sessions from scripted answer lines.
+
+    Parameters
+    ----------
+    lines: An iterable of answer lines without their line endings.
+    decks: Optional sequence of decks, session i being dealt
+           decks[i % len(decks)]. A deck can hold card names, e.g. from
+           make_deck, or card numbers, e.g. from a deck_corpus.
+
+    Returns
+    -------
+    result: A ScriptResult.
+    """
+    result = ScriptResult()
+    lines = iter(lines)
+    pack = RECORD_FORMAT.pack
+    records = result.records
+    positions = {}
+
+    # The validators print why they reject a line, which is not needed here.
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        while True:
+            choices = []
+            rejected = 0
+            started = False
+
+            try:
+                while len(choices) < NUMBER_OF_ROUNDS:
+                    line = next(lines)
+                    started = True
+                    chosen_card_pile = check_chosen_card_pile(line)
+
+                    if chosen_card_pile is None:
+                        rejected += 1
+                    else:
+                        choices.append(chosen_card_pile)
+
+                live_piles = ALL_FACE_DOWN_PILES
+
+                while count_live_piles(live_piles) > 2:
+                    chosen_piles = check_2_piles(next(lines), None,
+                                                 live_piles)
+
+                    if chosen_piles is None:
+                        rejected += 1
+                    else:
+                        live_piles = remove_piles_from_mask(chosen_piles,
+                                                            live_piles)
+
+                while count_live_piles(live_piles) != 1:
+                    chosen_pile = check_1_pile(next(lines), None, live_piles)
+
+                    if chosen_pile is None:
+                        rejected += 1
+                    else:
+                        live_piles = remove_piles_from_mask(chosen_pile,
+                                                            live_piles)
+
+                while check_1_card(next(lines)) is None:
+                    rejected += 1
+
+            except StopIteration:
+                result.unfinished = started
+                break
+
+            choices = bytes(choices)
+            position = positions.get(choices)
+
+            if position is None:
+                position = positions[choices] = \
+                    compile_plan(choices)[CHOSEN_CARD_INDEX]
+
+            if not (live_piles >> CARD_PILE_INDEX) & 1:
+                position = card = NO_CARD
+
+            elif decks is None:
+                card = NO_CARD
+
+            else:
+                card = decks[result.sessions % len(decks)][position]
+
+                if isinstance(card, str):
+                    card = CARD_CODES[card]
+
+            records += pack(result.sessions, choices, live_piles, rejected,
+                            position, card)
+            result.sessions += 1
+            result.rejected += rejected
+
+    return result
+
+
+def read_records(data):
+    """Unpacks the records written by play_script.
+
+    Parameters
+    ----------
+    data: A bytes like object of whole records.
+
+    Returns
+    -------
+    records: An iterator of (session, choices, live, rejected, position,
+             card) tuples.
+    """
+    return RECORD_FORMAT.iter_unpack(data)
+
+
+class _SeededDecks:
+    """The deck of each session from its own session_rng stream.
+
+    Shuffling a deck costs more than playing a session, so the time spent
+    on it is kept in elapsed and reported apart from the sessions.
+    """
+
+    __slots__ = ("root", "elapsed")
+
+    def __init__(self, seed):
+        self.root = SeedSequence(seed)
+        self.elapsed = 0.0
+
+    def __len__(self):
+        return 2 ** 32
+
+    def __getitem__(self, index):
+        start = time.perf_counter()
+        deck = make_deck(self.root.child(index).random())
+        self.elapsed += time.perf_counter() - start
+
+        return deck
+
+
+def main(argv=None):
+    """Plays a stream of scripted answers and writes the records."""
+    parser = argparse.ArgumentParser(
+        description="Play scripted sessions of the Twenty One trick.")
+    parser.add_argument("answers", nargs="?", default="-",
+                        help="file of answer lines, - for stdin")
+    parser.add_argument("--output", metavar="FILE",
+                        help="file to write the records to")
+    decks = parser.add_mutually_exclusive_group()
+    decks.add_argument("--seed", type=int, default=None,
+                       help="shuffle session i's deck from its own stream")
+    decks.add_argument("--corpus", metavar="FILE",
+                       help="deal session i deck i of a deck_corpus file")
+    args = parser.parse_args(argv)
+
+    if args.answers == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(args.answers, "rb") as answers_file:
+            data = answers_file.read()
+
+    lines = data.decode(errors="replace").splitlines()
+    corpus = None
+
+    if args.corpus:
+        from deck_corpus import DeckCorpus
+        corpus = DeckCorpus(args.corpus)
+
+    shuffle_time = 0.0
+    start = time.perf_counter()
+
+    if corpus is not None:
+        result = play_script(lines, corpus)
+    elif args.seed is not None:
+        decks = _SeededDecks(args.seed)
+        result = play_script(lines, decks)
+        shuffle_time = decks.elapsed
+    else:
+        result = play_script(lines)
+
+    elapsed = time.perf_counter() - start - shuffle_time
+
+    if corpus is not None:
+        corpus.close()
+
+    if args.output:
+        with open(args.output, "wb") as records_file:
+            records_file.write(result.records)
+
+    print(str(result.sessions) + " sessions, " + str(result.rejected) +
+          " rejected lines, " +
+          str(round(result.sessions / max(elapsed, 1e-9))) +
+          " sessions/second" +
+          (", " + str(round(shuffle_time, 3)) + " s shuffling decks"
+           if shuffle_time else "") +
+          (", last session unfinished" if result.unfinished else ""),
+          file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,283 @@
+"""asyncio TCP server for playing the 'Twenty One' card trick.
+
+Each connection gets its own TrickSession. The server sends the text of each
+turn followed by the prompt on its own line, and reads one answer per line,
+so any line based client such as telnet or nc can play:
+
+    python trick_server.py --port 2121
+    nc localhost 2121
+
+A session only holds its cards between answers, and a waiting connection is
+just a suspended coroutine, so one process can keep thousands of idle
+players. run_client plays a scripted game against a server for testing.
+
+With --log FILE every session's deck and accepted answers are appended to a
+session_log event log, which session_log can replay. With --corpus FILE the
+sessions are dealt from a deck_corpus file, session n getting deck n, so
+load tests against the server play the same decks every run. With --seed N
+each session shuffles its own deck from its own random stream, see
+trick_random, so the decks are also the same every run.
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import asyncio
+import itertools
+import struct
+import traceback
+
+from card_trick import make_deck, timed_phase
+from trick_random import session_rng
+from trick_session import TrickSession, PROMPTS
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 2121
+
+# Longest answer line accepted, which also bounds each reader's buffer.
+MAX_LINE_LENGTH = 64
+
+PROMPT_LINES = frozenset(prompt for prompt in PROMPTS.values() if prompt)
+
+
+def encode_turn(text, prompt):
+    """Encodes the text of a turn and its prompt to send to the player."""
+    if prompt:
+        text += prompt + "\n"
+
+    return text.encode()
+
+
+async def serve_session(reader, writer, idle_timeout=None, event_log=None,
+                        session_id=0, deck=None, seed=None):
+    """Plays one session of the trick over a connection.
+
+    Parameters
+    ----------
+    reader: The asyncio.StreamReader of the connection.
+    writer: The asyncio.StreamWriter of the connection.
+    idle_timeout: Optional number of seconds to wait for each answer before
+                  closing the connection.
+    event_log: Optional session_log.SessionLogWriter to log the session to.
+    session_id: The id of the session in the event log.
+    deck: Optional list of cards to deal. A new deck is made when this is
+          not given.
+    seed: Optional root seed to shuffle the new deck from, with the stream
+          trick_random.session_rng gives the session id. The seed is then
+          logged instead of the deck.
+    """
+    seeded = deck is None and seed is not None
+
+    if seeded:
+        deck = make_deck(session_rng(seed, session_id))
+
+    try:
+        if event_log is None:
+            session = TrickSession(deck)
+        else:
+            if seeded:
+                event_log.log_seed(session_id, seed)
+            else:
+                if deck is None:
+                    deck = make_deck()
+                event_log.log_deck(session_id, deck)
+            session = TrickSession(deck, event_log.recorder(session_id))
+
+        writer.write(encode_turn(session.start(), session.prompt))
+        await writer.drain()
+
+        while not session.finished:
+            # Work out the next turn while the player thinks, so a pile
+            # number is answered straight from the cache.
+            session.precompute()
+
+            if event_log is not None:
+                # Everything logged so far reaches the file before waiting
+                # on the player, who may never answer.
+                event_log.flush()
+
+            try:
+                with timed_phase("player"):
+                    line = await asyncio.wait_for(reader.readline(),
+                                                  idle_timeout)
+            except ValueError:
+                # The line was longer than MAX_LINE_LENGTH.
+                break
+
+            if not line:
+                break
+
+            try:
+                text = session.answer(
+                    line.decode(errors="replace").rstrip("\r\n"))
+            except Exception:  # pylint: disable=broad-except
+                # A bug in one session must not take the server down, so
+                # report it and end only this connection.
+                traceback.print_exc()
+                break
+
+            writer.write(encode_turn(text, session.prompt))
+            await writer.drain()
+
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+    finally:
+        if event_log is not None:
+            event_log.flush()
+        writer.close()
+
+
+async def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT,
+                       idle_timeout=None, event_log=None, corpus=None,
+                       seed=None):
+    """Starts the trick server.
+
+    Parameters
+    ----------
+    host: The address to listen on.
+    port: The port to listen on, or 0 for any free port.
+    idle_timeout: Optional number of seconds to wait for each answer.
+    event_log: Optional session_log.SessionLogWriter to log every session
+               to, numbering them in the order they connect after the
+               sessions already in the log.
+    corpus: Optional deck_corpus.DeckCorpus to deal the sessions from, in
+            the order they connect.
+    seed: Optional root seed to shuffle each session's deck from instead.
+
+    Returns
+    -------
+    server: The asyncio.Server, already accepting connections.
+    """
+    connections = itertools.count()
+    first_session_id = 0 if event_log is None else event_log.next_session_id
+
+    async def handle_connection(reader, writer):
+        connection = next(connections)
+        deck = None if corpus is None else corpus.deck(connection)
+        await serve_session(reader, writer, idle_timeout, event_log,
+                            first_session_id + connection, deck, seed)
+
+    return await asyncio.start_server(handle_connection, host, port,
+                                      limit=MAX_LINE_LENGTH)
+
+
+async def run_client(answers, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Plays a scripted session against a running server.
+
+    Parameters
+    ----------
+    answers: A sequence of answer lines to send, one for each prompt.
+    host: The address of the server.
+    port: The port of the server.
+
+    Returns
+    -------
+    transcript: Everything the server sent, as text.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    transcript = []
+
+    try:
+        for answer in answers:
+            transcript.append(await read_until_prompt(reader))
+            writer.write(answer.encode() + b"\n")
+            await writer.drain()
+
+        transcript.append((await reader.read()).decode())
+
+    finally:
+        writer.close()
+
+    return "".join(transcript)
+
+
+async def read_until_prompt(reader):
+    """Reads what the server sends up to and including the next prompt.
+
+    Parameters
+    ----------
+    reader: The asyncio.StreamReader of a connection to the server.
+
+    Returns
+    -------
+    text: The text read, ending with the prompt line, or everything left
+          when the server closes the connection first.
+    """
+    lines = []
+
+    while True:
+        line = await reader.readline()
+
+        if not line:
+            break
+
+        lines.append(line.decode())
+
+        if lines[-1][:-1] in PROMPT_LINES:
+            break
+
+    return "".join(lines)
+
+
+async def serve_forever(host, port, idle_timeout, event_log=None,
+                        corpus=None, seed=None):
+    """Runs the server until it is interrupted."""
+    server = await start_server(host, port, idle_timeout, event_log, corpus,
+                                seed)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Starts the server from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Serve the Twenty One trick over TCP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="seconds to wait for each answer")
+    parser.add_argument("--log", metavar="FILE",
+                        help="append every session to a session event log")
+    decks = parser.add_mutually_exclusive_group()
+    decks.add_argument("--corpus", metavar="FILE",
+                       help="deal the sessions from a deck_corpus file")
+    decks.add_argument("--seed", type=int, default=None,
+                       help="root seed for every session's own shuffle")
+    args = parser.parse_args(argv)
+
+    event_log = None
+    corpus = None
+
+    if args.log:
+        from session_log import SessionLogWriter, SEED_FORMAT
+
+        if args.seed is not None:
+            try:
+                SEED_FORMAT.pack(args.seed)
+            except struct.error:
+                parser.error("--seed has to fit in a signed 64 bit int to "
+                             "be logged")
+
+        event_log = SessionLogWriter(args.log)
+
+    if args.corpus:
+        from deck_corpus import DeckCorpus
+        corpus = DeckCorpus(args.corpus)
+
+    try:
+        asyncio.run(serve_forever(args.host, args.port, args.idle_timeout,
+                                  event_log, corpus, args.seed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if event_log is not None:
+            event_log.close()
+        if corpus is not None:
+            corpus.close()
+
+
+if __name__ == "__main__":
+    main()
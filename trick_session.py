@@ -0,0 +1,433 @@
+"""Resumable state machine for one game of the 'Twenty One' card trick.
+
+main() in card_trick asks for each answer with input(), which blocks until
+the player replies. A TrickSession instead returns the text to show and the
+next prompt, then waits to be given the answer, so many sessions can be
+served side by side, e.g. by trick_server.
+
+The session uses the same functions as the terminal game, catching what they
+print with trick_render so the text sent to the player is unchanged and each
+turn is one piece of text.
+
+While a session waits for a pile number there are only three answers it
+can take, so precompute() picks up, deals and renders the next turn for each
+of them ahead of time, e.g. while the player is thinking. The answer then
+only writes the cached text.
+
+A session can be packed into SNAPSHOT_SIZE bytes with snapshot() and
+restored exactly with TrickSession.restore(), e.g. to move it to another
+worker process or to keep an idle session on disk instead of in memory.
+"""
+
+# pylint: disable=C0103
+
+import struct
+import sys
+
+from card_trick import (make_deck, deal_cards_into_3_columns,
+                        print_three_card_piles, pick_up_card_piles,
+                        print_card_pile_face_down, remove_piles,
+                        remove_piles_from_mask, count_live_piles,
+                        ALL_FACE_DOWN_PILES, CARD_PILE_INDEX, PILE_SLICES,
+                        CHOSEN_CARD_INDEX, print_2_cards,
+                        print_last_card_removal, check_chosen_card_pile,
+                        check_2_piles, check_1_pile, check_1_card,
+                        CHOSEN_CARD_PILE_PROMPT, TWO_PILES_PROMPT,
+                        ONE_PILE_PROMPT, ONE_CARD_PROMPT, CARD_NAMES,
+                        timed_phase)
+from card_encoding import CARD_CODES
+from trick_render import render_frames
+
+
+# The answer each state is waiting for.
+CHOSEN_CARD_PILE = "chosen_card_pile"
+TWO_PILES = "two_piles"
+ONE_PILE = "one_pile"
+ONE_CARD = "one_card"
+FINISHED = "finished"
+
+PROMPTS = {CHOSEN_CARD_PILE: CHOSEN_CARD_PILE_PROMPT,
+           TWO_PILES: TWO_PILES_PROMPT,
+           ONE_PILE: ONE_PILE_PROMPT,
+           ONE_CARD: ONE_CARD_PROMPT,
+           FINISHED: ""}
+
+NUMBER_OF_TURNS = 3
+
+# Snapshot layout: version, state, turn, removed piles bit mask, then the
+# number of each of the 21 cards, see card_encoding.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMAT = struct.Struct("<BBBB21s")
+SNAPSHOT_SIZE = SNAPSHOT_FORMAT.size
+
+STATES = (CHOSEN_CARD_PILE, TWO_PILES, ONE_PILE, ONE_CARD, FINISHED)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+
+def _live_piles_fit(state, live_pile_count):
+    """Checks the number of face down piles left can be seen in a state."""
+    if state == CHOSEN_CARD_PILE:
+        return live_pile_count == len(PILE_SLICES)
+
+    if state == TWO_PILES:
+        return live_pile_count > 2
+
+    if state == ONE_PILE:
+        return live_pile_count == 2
+
+    return live_pile_count == 1
+
+
+class TrickSession:
+    """One game of the trick, moved on one answer at a time.
+
+    Only the cards and the answers so far are kept, so an idle session costs
+    a few small lists of references to the shared card names.
+
+    Parameters
+    ----------
+    deck: Optional list of at least 21 cards. A new deck is made when this is
+          not given.
+    recorder: Optional function called with the state and the validated
+              answer each time an answer is accepted, e.g. to write a
+              session_log. It is not part of a snapshot.
+    """
+
+    __slots__ = ("state", "turn", "deck_fragment", "card_piles", "live_piles",
+                 "recorder", "next_turns")
+
+    def __init__(self, deck=None, recorder=None):
+        if deck is None:
+            deck = make_deck()
+
+        self.state = CHOSEN_CARD_PILE
+        self.turn = 1
+        self.deck_fragment = deal_cards_into_3_columns(deck[0:21])
+        self.card_piles = None
+        self.live_piles = ALL_FACE_DOWN_PILES
+        self.recorder = recorder
+        self.next_turns = None
+
+    @property
+    def finished(self):
+        """True once the card has been revealed."""
+        return self.state == FINISHED
+
+    @property
+    def prompt(self):
+        """The question the session is waiting for an answer to."""
+        return PROMPTS[self.state]
+
+    def snapshot(self):
+        """Packs the session into SNAPSHOT_SIZE bytes.
+
+        Returns
+        -------
+        data: A bytes object which TrickSession.restore turns back into an
+              equal session.
+
+        Raises
+        ------
+        KeyError: If the session was dealt cards which are not from
+                  make_deck.
+        """
+        if self.state == CHOSEN_CARD_PILE:
+            # Still dealt into 3 columns, stored one after the other.
+            cards = self.deck_fragment[0] + self.deck_fragment[1] + \
+                self.deck_fragment[2]
+        else:
+            cards = self.deck_fragment
+
+        removed_piles = ALL_FACE_DOWN_PILES & ~self.live_piles
+
+        return SNAPSHOT_FORMAT.pack(SNAPSHOT_VERSION, STATE_CODES[self.state],
+                                    self.turn, removed_piles,
+                                    bytes(CARD_CODES[card] for card in cards))
+
+    @classmethod
+    def restore(cls, data, recorder=None):
+        """Rebuilds a session from the bytes made by snapshot.
+
+        Parameters
+        ----------
+        data: A bytes like object of SNAPSHOT_SIZE bytes.
+        recorder: Optional recorder for the restored session.
+
+        Returns
+        -------
+        session: A TrickSession in the same state as the one packed.
+
+        Raises
+        ------
+        ValueError: If data is not a snapshot this version can restore, or
+                    is not a state the game can reach.
+        """
+        if len(data) != SNAPSHOT_SIZE:
+            raise ValueError("A snapshot is " + str(SNAPSHOT_SIZE) +
+                             " bytes, got " + str(len(data)) + ".")
+
+        version, state_code, turn, removed_piles, codes = \
+            SNAPSHOT_FORMAT.unpack(data)
+
+        if version != SNAPSHOT_VERSION or state_code >= len(STATES):
+            raise ValueError("Not a snapshot of this version.")
+
+        if max(codes) >= len(CARD_NAMES):
+            raise ValueError("Snapshot contains an unknown card.")
+
+        if len(set(codes)) != len(codes):
+            raise ValueError("Snapshot contains the same card twice.")
+
+        state = STATES[state_code]
+
+        if not 1 <= turn <= NUMBER_OF_TURNS or (
+                state != CHOSEN_CARD_PILE and turn != NUMBER_OF_TURNS):
+            raise ValueError("Snapshot has an impossible turn " + str(turn) +
+                             ".")
+
+        if (removed_piles & ~ALL_FACE_DOWN_PILES or
+                removed_piles & (1 << CARD_PILE_INDEX) or
+                not _live_piles_fit(state, count_live_piles(
+                    ALL_FACE_DOWN_PILES & ~removed_piles))):
+            raise ValueError("Snapshot has impossible removed piles.")
+
+        cards = [CARD_NAMES[code] for code in codes]
+
+        session = cls.__new__(cls)
+        session.state = state
+        session.turn = turn
+        session.recorder = recorder
+        session.next_turns = None
+        session.live_piles = ALL_FACE_DOWN_PILES & ~removed_piles
+
+        if session.state == CHOSEN_CARD_PILE:
+            session.deck_fragment = [cards[0:7], cards[7:14], cards[14:21]]
+            session.card_piles = None
+        else:
+            session.deck_fragment = cards
+            session.card_piles = [
+                [""] if removed_piles & (1 << index) else cards[start:end]
+                for index, (start, end) in enumerate(PILE_SLICES)]
+
+        return session
+
+    def start(self):
+        """Returns the text shown before the first answer.
+
+        Returns
+        -------
+        text: The first deal of the cards, without the prompt.
+        """
+        frames = []
+
+        with timed_phase("deal"), render_frames(frames.append):
+            print()
+            print_three_card_piles(self.deck_fragment)
+
+        return "".join(frames)
+
+    def precompute(self):
+        """Works out the next turn for each possible pile number.
+
+        It does nothing unless the session is waiting for a pile number. The
+        dealt cards and text of each turn are kept until the next valid
+        answer, which then only writes the text, in about half the time. They
+        take about 2.7 KB, against about 0.5 KB for the rest of the session,
+        so a server with many idle sessions can snapshot them instead. They
+        are not part of a snapshot.
+        """
+        if self.state != CHOSEN_CARD_PILE or self.next_turns is not None:
+            return
+
+        with timed_phase("precompute"):
+            self.next_turns = tuple(
+                self._render_turn(self._pick_up(pile_of_chosen_card))
+                for pile_of_chosen_card in (1, 2, 3))
+
+    def answer(self, text):
+        """Gives the session the player's answer to its prompt.
+
+        An answer which is not valid leaves the session where it was, with
+        the same message the terminal game prints.
+
+        Parameters
+        ----------
+        text: The line the player entered, without the newline.
+
+        Returns
+        -------
+        text: The text to show the player before the next prompt.
+        """
+        if self.finished:
+            raise ValueError("The session has already finished.")
+
+        frames = []
+
+        with render_frames(frames.append):
+            if self.state == CHOSEN_CARD_PILE:
+                self._answer_chosen_card_pile(text)
+            elif self.state == TWO_PILES:
+                self._answer_two_piles(text)
+            elif self.state == ONE_PILE:
+                self._answer_one_pile(text)
+            else:
+                self._answer_one_card(text)
+
+        return "".join(frames)
+
+    def _answer_chosen_card_pile(self, text):
+        pile_of_chosen_card = check_chosen_card_pile(text)
+
+        if pile_of_chosen_card is None:
+            print()
+            return
+
+        if self.recorder is not None:
+            self.recorder(self.state, pile_of_chosen_card)
+
+        next_turn = None
+
+        if self.next_turns is not None:
+            next_turn = self.next_turns[pile_of_chosen_card - 1]
+            self.next_turns = None
+
+        # With a precomputed turn there is nothing left to pick up, deal or
+        # print, only the cached text to write.
+        with timed_phase("pick_up"):
+            if next_turn is None:
+                picked_up = self._pick_up(pile_of_chosen_card)
+
+        if self.turn < NUMBER_OF_TURNS:
+            with timed_phase("deal"):
+                if next_turn is None:
+                    next_turn = self._render_turn(picked_up)
+
+                self.deck_fragment, text = next_turn
+                sys.stdout.write(text)
+
+            self.turn += 1
+            return
+
+        # The last turn shows the piles again and then the chosen card, in
+        # one piece of text, so both are timed as the final card.
+        with timed_phase("final_card"):
+            if next_turn is None:
+                next_turn = self._render_turn(picked_up)
+
+            deck_fragment, text = next_turn
+            sys.stdout.write(text)
+
+        with timed_phase("deal"):
+            self.deck_fragment = deck_fragment
+            self.card_piles = [deck_fragment[start:end]
+                               for start, end in PILE_SLICES]
+            print_card_pile_face_down(self.card_piles)
+
+        self.state = TWO_PILES
+
+    def _pick_up(self, pile_of_chosen_card):
+        """Picks up the piles for a pile number without changing the session.
+
+        Returns
+        -------
+        deck_fragment: A list of the 21 cards after they are picked up.
+        """
+        # pick_up_card_piles swaps the columns it is given, so it gets a copy
+        # to keep the session as it was.
+        return pick_up_card_piles(pile_of_chosen_card,
+                                  list(self.deck_fragment))
+
+    def _render_turn(self, deck_fragment):
+        """Deals picked up cards and renders what the answer shows.
+
+        Parameters
+        ----------
+        deck_fragment: The cards from _pick_up.
+
+        Returns
+        -------
+        (deck_fragment, text): The cards dealt into 3 columns, or as they
+            are after the last turn, and the text to show.
+        """
+        frames = []
+
+        with render_frames(frames.append):
+            if self.turn < NUMBER_OF_TURNS:
+                deck_fragment = deal_cards_into_3_columns(deck_fragment)
+                print()
+                print_three_card_piles(deck_fragment)
+
+            else:
+                print()
+                print_three_card_piles(self.deck_fragment)
+
+                print()
+                print(deck_fragment[CHOSEN_CARD_INDEX])
+                print()
+
+        return deck_fragment, "".join(frames)
+
+    def _answer_two_piles(self, text):
+        chosen_piles = check_2_piles(text, self.card_piles, self.live_piles)
+
+        if chosen_piles is None:
+            print()
+            return
+
+        if self.recorder is not None:
+            self.recorder(self.state, chosen_piles)
+
+        with timed_phase("elimination"):
+            self.card_piles = remove_piles(chosen_piles, self.card_piles)
+            self.live_piles = remove_piles_from_mask(chosen_piles,
+                                                     self.live_piles)
+            print_card_pile_face_down(self.card_piles)
+
+        if count_live_piles(self.live_piles) == 2:
+            self.state = ONE_PILE
+
+        elif count_live_piles(self.live_piles) == 1:
+            self._show_last_pile()
+
+    def _answer_one_pile(self, text):
+        chosen_pile = check_1_pile(text, self.card_piles, self.live_piles)
+
+        if chosen_pile is None:
+            print()
+            return
+
+        if self.recorder is not None:
+            self.recorder(self.state, chosen_pile)
+
+        with timed_phase("elimination"):
+            self.card_piles = remove_piles(chosen_pile, self.card_piles)
+            self.live_piles = remove_piles_from_mask(chosen_pile,
+                                                     self.live_piles)
+            print_card_pile_face_down(self.card_piles)
+
+        self._show_last_pile()
+
+    def _show_last_pile(self):
+        print("Only one pile remaining. Now I will find your card. ")
+        print()
+
+        print_2_cards()
+        self.state = ONE_CARD
+
+    def _answer_one_card(self, text):
+        chosen_card = check_1_card(text)
+
+        if chosen_card is None:
+            print()
+            return
+
+        if self.recorder is not None:
+            self.recorder(self.state, chosen_card)
+
+        with timed_phase("reveal"):
+            print_last_card_removal(chosen_card)
+
+            print("There is only one card left...")
+            print("Your card is", self.card_piles[CARD_PILE_INDEX][1])
+
+        self.state = FINISHED
@@ -0,0 +1,216 @@
+"""Per phase latency timing for the 'Twenty One' card trick.
+
+The game in card_trick marks its phases with timed_phase:
+
+    turn_1 to turn_3  a whole turn, including its deal, player and pick up
+    deal              dealing and showing the piles, on every turn and for
+                      the face down piles of the extra credit
+    player            waiting for the player to answer
+    pick_up           picking the piles up after an answer
+    final_card        showing the card the three turns found
+    elimination       removing the face down piles the player chose and
+                      showing the piles left
+    reveal            removing the last other card and showing the card
+
+Only the turns nest other phases. A TrickSession marks the same phases
+except the turns and the player, which trick_server times itself, and also
+marks its "precompute". Its final_card also shows the piles again, as both
+come from one piece of cached text.
+
+Timing is off until enable_timing is called. Each phase is then recorded
+into a LatencyHistogram, an HDR style histogram with a fixed relative
+precision, and the histograms can be dumped as JSON:
+
+    python trick_timing.py --output timings.json
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import json
+import time
+
+import card_trick
+
+
+# Each power of two range of values is split into 2 ** SUB_BUCKET_BITS / 2
+# buckets, so a recorded value is off by less than 1 / 64 of itself.
+SUB_BUCKET_BITS = 7
+
+
+class LatencyHistogram:
+    """An HDR style histogram of latencies in nanoseconds.
+
+    Values below 2 ** SUB_BUCKET_BITS are counted exactly. Larger values are
+    counted in buckets which grow with the value, so the histogram keeps the
+    same relative precision from nanoseconds to minutes in a few hundred
+    buckets.
+    """
+
+    __slots__ = ("counts", "total_count", "min", "max", "sum")
+
+    def __init__(self):
+        self.counts = {}
+        self.total_count = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    @staticmethod
+    def bucket_of(value):
+        """Finds the bucket a value is counted in.
+
+        Parameters
+        ----------
+        value: A non negative int.
+
+        Returns
+        -------
+        bucket: The lowest value counted in the same bucket.
+        """
+        shift = value.bit_length() - SUB_BUCKET_BITS
+
+        if shift <= 0:
+            return value
+
+        return (value >> shift) << shift
+
+    def record(self, value):
+        """Counts one latency in nanoseconds."""
+        bucket = self.bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total_count += 1
+        self.sum += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Finds the latency below which the given percent of values fall.
+
+        Parameters
+        ----------
+        percent: A number from 0 to 100, e.g. 99.9.
+
+        Returns
+        -------
+        value: The lowest value of the bucket holding that percentile, or
+               None if nothing has been recorded.
+        """
+        if not self.total_count:
+            return None
+
+        wanted = max(1, -(-self.total_count * percent // 100))
+        seen = 0
+
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= wanted:
+                return bucket
+
+        return self.max
+
+    def to_dict(self):
+        """Returns the histogram as plain data for JSON."""
+        return {"count": self.total_count,
+                "min_ns": self.min,
+                "max_ns": self.max,
+                "mean_ns": self.sum / self.total_count
+                           if self.total_count else None,
+                "p50_ns": self.percentile(50),
+                "p90_ns": self.percentile(90),
+                "p99_ns": self.percentile(99),
+                "p999_ns": self.percentile(99.9),
+                "buckets": sorted(self.counts.items())}
+
+
+class _TimedPhase:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter_ns() - self.start)
+        return False
+
+
+class PhaseTimer:
+    """Keeps one LatencyHistogram for each phase name."""
+
+    def __init__(self):
+        self.histograms = {}
+
+    def phase(self, name):
+        """Returns a context manager recording one run of a phase."""
+        histogram = self.histograms.get(name)
+
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+
+        return _TimedPhase(histogram)
+
+    def to_dict(self):
+        """Returns every phase's histogram as plain data for JSON."""
+        return {name: histogram.to_dict()
+                for name, histogram in sorted(self.histograms.items())}
+
+
+def enable_timing(timer=None):
+    """Starts timing the phases of the game.
+
+    Parameters
+    ----------
+    timer: Optional PhaseTimer to record into. A new one is made when this
+           is not given.
+
+    Returns
+    -------
+    timer: The PhaseTimer now recording.
+    """
+    if timer is None:
+        timer = PhaseTimer()
+
+    card_trick.phase_timer = timer
+
+    return timer
+
+
+def disable_timing():
+    """Stops timing the phases of the game."""
+    card_trick.phase_timer = None
+
+
+def dump_json(timer, path):
+    """Writes the histograms of a PhaseTimer to a JSON file."""
+    with open(path, "w") as timing_file:
+        json.dump(timer.to_dict(), timing_file, indent=2)
+
+
+def main(argv=None):
+    """Plays the game with timing on and dumps the histograms."""
+    parser = argparse.ArgumentParser(
+        description="Play the Twenty One trick and record phase timings.")
+    parser.add_argument("--output", default="timings.json",
+                        help="file to write the histograms to")
+    args = parser.parse_args(argv)
+
+    timer = enable_timing()
+
+    try:
+        card_trick.main()
+    finally:
+        disable_timing()
+        dump_json(timer, args.output)
+
+
+if __name__ == "__main__":
+    main()
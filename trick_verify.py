@@ -0,0 +1,226 @@
+"""Monte Carlo check of the 'Twenty One' trick across many processes.
+
+Each session shuffles a deck, picks a random card, answers the three pile
+questions for it and checks that the card lands at deck_fragment[10]. It
+then plays the extra credit with random, valid pile and card choices and
+checks that the card revealed, the_card_pile[1], is still the chosen card.
+
+Every worker process runs its share of the sessions with its own child of
+the root SeedSequence, and every session in it with its own random stream,
+so a run is reproducible from its seed and number of workers. Each worker
+adds its counts into a shared memory array, so nothing is sent back per
+session and throughput grows with the number of cores:
+
+    python trick_verify.py 100000000 --workers 16 --seed 1
+"""
+
+# pylint: disable=C0103
+
+import argparse
+import multiprocessing
+import os
+import time
+from contextlib import redirect_stdout
+
+from card_trick import (make_deck, remove_piles, remove_piles_from_mask,
+                        count_live_piles, check_2_piles, check_1_pile,
+                        ALL_FACE_DOWN_PILES, CARD_PILE_INDEX, PILE_SLICES)
+from general_trick import TWENTY_ONE, next_position
+from trick_engine import run_planned_session, run_session
+from trick_random import SeedSequence
+
+
+# The counts each worker keeps in its slot of the shared array.
+SESSIONS, PLACEMENT_FAILURES, REVEAL_FAILURES = range(3)
+COUNTS_PER_WORKER = 3
+
+ENGINES = {"planned": run_planned_session, "replay": run_session}
+
+
+def pile_choices_for_position(initial_position):
+    """Finds the pile answers for the card first dealt at a position.
+
+    general_trick.honest_pile_choices finds the same answers by dealing the
+    cards. Following the position alone is faster for many sessions.
+    """
+    pile_choices = []
+    position = initial_position
+
+    for _ in range(TWENTY_ONE.rounds):
+        pile_choices.append(position % TWENTY_ONE.columns + 1)
+        position = next_position(TWENTY_ONE, position)
+
+    return pile_choices
+
+
+def _live_pile_numbers(live_piles):
+    return [index + 1 for index in range(CARD_PILE_INDEX + 1)
+            if (live_piles >> index) & 1]
+
+
+def play_random_extra_credit(deck_fragment, rng):
+    """Plays the extra credit with random valid answers.
+
+    The answers go through check_2_piles and check_1_pile, so they follow
+    the same rules as a player at the terminal.
+
+    Parameters
+    ----------
+    deck_fragment: A list of the 21 cards after the last pick up.
+    rng: A random.Random for the answers.
+
+    Returns
+    -------
+    revealed_card: The card the game reveals, the_card_pile[1].
+    """
+    card_piles = [deck_fragment[start:end] for start, end in PILE_SLICES]
+    live_piles = ALL_FACE_DOWN_PILES
+
+    while True:
+        pile_numbers = _live_pile_numbers(live_piles)
+        answer = (str(rng.choice(pile_numbers)) + " " +
+                  str(rng.choice(pile_numbers)))
+        chosen_piles = check_2_piles(answer, card_piles, live_piles)
+        card_piles = remove_piles(chosen_piles, card_piles)
+        live_piles = remove_piles_from_mask(chosen_piles, live_piles)
+
+        if count_live_piles(live_piles) <= 2:
+            break
+
+    if count_live_piles(live_piles) != 1:
+        answer = str(rng.choice(_live_pile_numbers(live_piles)))
+        chosen_pile = check_1_pile(answer, card_piles, live_piles)
+        card_piles = remove_piles(chosen_pile, card_piles)
+        live_piles = remove_piles_from_mask(chosen_pile, live_piles)
+
+    the_card_pile = card_piles[CARD_PILE_INDEX]
+
+    return the_card_pile[1]
+
+
+def verify_sessions(number_of_sessions, seed, engine=run_planned_session):
+    """Runs and checks random sessions in this process.
+
+    Parameters
+    ----------
+    number_of_sessions: The number of sessions to run.
+    seed: The seed, an int or a SeedSequence. Session i takes its deck,
+          card and answers from child i of it.
+    engine: The function running the three rounds, see trick_engine.
+
+    Returns
+    -------
+    counts: A list of COUNTS_PER_WORKER counts, indexed by SESSIONS,
+            PLACEMENT_FAILURES and REVEAL_FAILURES.
+    """
+    if not isinstance(seed, SeedSequence):
+        seed = SeedSequence(seed)
+
+    counts = [0] * COUNTS_PER_WORKER
+
+    # remove_piles prints what it removes, which is not needed here.
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for session_index in range(number_of_sessions):
+            rng = seed.child(session_index).random()
+            deck = make_deck(rng)
+            initial_position = rng.randrange(TWENTY_ONE.number_of_cards)
+            chosen_card = deck[initial_position]
+
+            deck_fragment = engine(
+                pile_choices_for_position(initial_position), deck)
+
+            if deck_fragment[10] != chosen_card:
+                counts[PLACEMENT_FAILURES] += 1
+
+            if play_random_extra_credit(deck_fragment, rng) != chosen_card:
+                counts[REVEAL_FAILURES] += 1
+
+            counts[SESSIONS] += 1
+
+    return counts
+
+
+def _worker(shared_counts, worker_index, number_of_sessions, seed,
+            engine_name):
+    counts = verify_sessions(number_of_sessions, seed, ENGINES[engine_name])
+    offset = worker_index * COUNTS_PER_WORKER
+
+    shared_counts[offset:offset + COUNTS_PER_WORKER] = counts
+
+
+def run_verification(number_of_sessions, workers=None, seed=0,
+                     engine_name="planned"):
+    """Splits the sessions over worker processes and adds up the counts.
+
+    Parameters
+    ----------
+    number_of_sessions: The total number of sessions to run.
+    workers: The number of processes, the number of CPUs by default.
+    seed: The root seed. Worker i uses child i of SeedSequence(seed).
+    engine_name: The key in ENGINES of the engine to check.
+
+    Returns
+    -------
+    counts: A list of COUNTS_PER_WORKER totals over all workers.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    workers = max(1, min(workers, number_of_sessions))
+    shared_counts = multiprocessing.Array("q", workers * COUNTS_PER_WORKER,
+                                          lock=False)
+
+    worker_seeds = SeedSequence(seed).spawn(workers)
+    processes = []
+
+    for worker_index in range(workers):
+        share = (number_of_sessions // workers +
+                 (worker_index < number_of_sessions % workers))
+        process = multiprocessing.Process(
+            target=_worker,
+            args=(shared_counts, worker_index, share,
+                  worker_seeds[worker_index], engine_name))
+        process.start()
+        processes.append(process)
+
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError("A verifier process failed with exit code " +
+                               str(process.exitcode) + ".")
+
+    return [sum(shared_counts[offset::COUNTS_PER_WORKER])
+            for offset in range(COUNTS_PER_WORKER)]
+
+
+def main(argv=None):
+    """Verifies the trick and prints the counts and throughput."""
+    parser = argparse.ArgumentParser(
+        description="Check the Twenty One trick on random sessions.")
+    parser.add_argument("sessions", type=int, nargs="?", default=1000000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=sorted(ENGINES),
+                        default="planned")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = run_verification(args.sessions, args.workers, args.seed,
+                              args.engine)
+    elapsed = time.perf_counter() - start
+
+    print(str(counts[SESSIONS]) + " sessions, " +
+          str(counts[PLACEMENT_FAILURES]) + " not at deck_fragment[10], " +
+          str(counts[REVEAL_FAILURES]) + " wrong reveals, " +
+          str(round(counts[SESSIONS] / max(elapsed, 1e-9))) +
+          " sessions/second")
+
+    if counts[PLACEMENT_FAILURES] or counts[REVEAL_FAILURES]:
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())